@@ -1,5 +1,4 @@
 import pandas as pd
-import numpy as np
 from helper_methods import get_df_rows_timeout, get_df_rows_no_timeout
 
 # Different columns get different grouping treatment
@@ -18,54 +17,50 @@ AND_relation_columns = []
 any_no_nan_columns = ['CLUSTER_INC_DATA']
 
 
-def group(df):
+INCONSISTENT = 'INCONSISTENT'
+
+
+def mark_inconsistent(values, consistent):
+  if consistent.all():
+    return values
+  if isinstance(values.dtype, pd.CategoricalDtype):
+    # INCONSISTENT is not one of the categories
+    values = values.astype(values.dtype.categories.dtype)
+  return values.where(consistent, INCONSISTENT)
+
+
+def all_equal(grouped, col):
+  # First value of the group (even a NaN) when its non-null values are all equal,
+  # first(skipna=False) needs pandas >= 2.2.1
+  return mark_inconsistent(grouped[col].first(skipna=False), grouped[col].nunique() == 1)
+
 
-  # Define custom aggregation functions
-  def check_all_equal(series):
-      if series.nunique() == 1:
-          return series.iloc[0]
-      else:
-          return 'INCONSISTENT'
-
-
-  def any_non_nan(series):
-      return next((x for x in series if pd.notna(x) and x is not None), None)
-
-  def custom_null_agg(series):
-      non_null = series.dropna()
-      if non_null.empty:
-          return np.nan
-      elif non_null.nunique() == 1:
-          return non_null.iloc[0]
-      else:
-          return 'INCONSISTENT'
-
-
-  def and_relation(series):
-      if series.isin([0, 1, True, False]).all():
-          return all(series)
-      else:
-          return 'INCONSISTENT'
-
-  def or_relation(series):
-      if series.isin([0, 1, True, False]).all():
-          return any(series)
-      else:
-          return 'INCONSISTENT'
-      
+def null_agg(grouped, col):
+  # The non-null value when there is exactly one, NaN when there is none
+  return mark_inconsistent(grouped[col].first(), grouped[col].nunique() <= 1)
+
+
+def relation(df, keys, col, how):
+  # 'all' (AND) or 'any' (OR) of the group, when every value is 0/1/True/False
+  flags = pd.DataFrame({'valid': df[col].isin([0, 1, True, False]), 'value': df[col] == 1})
+  grouped = flags.groupby([df[key] for key in keys], observed=True)
+  return mark_inconsistent(grouped['value'].agg(how), grouped['valid'].all())
+
+
+def group(df):
   # Split based on timeout
   df_no_timeout = get_df_rows_no_timeout(df)
   df_timeout = get_df_rows_timeout(df)
 
-  # Create the aggregation dictionary
-  agg_dict = {col: custom_null_agg for col in null_columns}
-  agg_dict.update({col: 'mean' for col in mean_columns})
-  agg_dict.update({col: check_all_equal for col in equal_columns})
-  agg_dict.update({col: and_relation for col in AND_relation_columns})
-  agg_dict.update({col: or_relation for col in OR_relation_columns})
-
-  # Perform the groupby operation with the specified aggregations on df_no_timeout
-  df_aggregated_no_timeout = df_no_timeout.groupby(['Spec', 'RunConfig']).agg(agg_dict).reset_index()
+  # One groupby primitive per column kind, no Python call per group
+  keys = ['Spec', 'RunConfig']
+  grouped = df_no_timeout.groupby(keys, observed=True)
+  aggregated = {col: null_agg(grouped, col) for col in null_columns}
+  aggregated.update(grouped[mean_columns].mean().items())
+  aggregated.update({col: all_equal(grouped, col) for col in equal_columns})
+  aggregated.update({col: relation(df_no_timeout, keys, col, 'all') for col in AND_relation_columns})
+  aggregated.update({col: relation(df_no_timeout, keys, col, 'any') for col in OR_relation_columns})
+  df_aggregated_no_timeout = pd.DataFrame(aggregated).reset_index()
 
   # For df_timeout, we'll keep all rows
   df_timeout_reset = df_timeout
@@ -4,11 +4,11 @@ import numpy as np
 
 
 def get_df_specs_no_timeout(df):
-    spec_timeout_mask = df.groupby(['Spec'])['TIMEOUT'].transform('any')
+    spec_timeout_mask = df.groupby(['Spec'], observed=True)['TIMEOUT'].transform('any')
     return df[~spec_timeout_mask]
 
 def get_df_specs_timeout(df):
-    spec_timeout_mask = df.groupby(['Spec'])['TIMEOUT'].transform('any')
+    spec_timeout_mask = df.groupby(['Spec'], observed=True)['TIMEOUT'].transform('any')
     return df[spec_timeout_mask]
 
 
@@ -21,17 +21,10 @@ def get_df_rows_timeout(df):
 
 
 def custom_cumcount(group):
-    out = pd.Series(index=group.index, dtype=int)  # Initialize an empty Series with the same index
-    count = 0
-
-    for idx, row in group.iterrows():
-        if row['TIMEOUT'] == 1:
-            out.at[idx] = count
-            count += 1
-        else:
-            out.at[idx] = -1
-
-    return out
+    # Running count of the TIMEOUT rows (0, 1, ...), -1 on the others, as floats like the
+    # NaN-initialized Series the row loop used to fill
+    timeouts = group['TIMEOUT'] == 1
+    return pd.Series(np.where(timeouts, timeouts.cumsum() - 1, -1), index=group.index, dtype=float)
 
 
 def retain_complete_runs(df):
@@ -39,7 +32,7 @@ def retain_complete_runs(df):
     df_filtered = df[df['TIMEOUT'] == 0]
 
     # Identify groups where all entries have 'TIMEOUT' (to be removed)
-    mask = df_filtered.groupby(['Spec', 'RunConfig'])['TIMEOUT'].transform(lambda x: (x == 'TIMEOUT').all())
+    mask = (df_filtered['TIMEOUT'] == 'TIMEOUT').groupby([df_filtered['Spec'], df_filtered['RunConfig']], observed=True).transform('all')
 
     # Filter out rows where its all TIMEOUT
     df_filtered = df_filtered[~mask]
@@ -63,7 +56,7 @@ def get_df_specs_same_column(df, column):
         return len(s.unique()) == 1
 
     # Group by 'Spec', check if all values in the given column are the same
-    specs_with_same_value = df_clean.groupby('Spec')[column].agg(all_equal)
+    specs_with_same_value = df_clean.groupby('Spec', observed=True)[column].agg(all_equal)
 
     # Filter the original dataframe to keep only the rows where 'Spec' has the same value for all entries
     df_filtered = df[df['Spec'].isin(specs_with_same_value[specs_with_same_value].index)]
@@ -90,7 +83,7 @@ def get_df_specs_value_in_column(df, column):
         return len(s.unique()) == 1
 
     # Group by 'Spec', check if all values in the given column are the same
-    specs_with_same_value = df_clean.groupby('Spec')[column].agg(all_equal)
+    specs_with_same_value = df_clean.groupby('Spec', observed=True)[column].agg(all_equal)
 
     # Filter the original dataframe to keep only the rows where 'Spec' has the same value for all entries
     df_filtered = df[df['Spec'].isin(specs_with_same_value[specs_with_same_value].index)]
@@ -102,11 +95,12 @@ def get_df_specs_value_in_column(df, column):
     return df_filtered
 
 def filter_groups_containing_value(df, group_column, value_column, target_value):
-    return df[df.groupby(group_column)[value_column].transform(lambda x: target_value in x.values)]
+    keys = [df[column] for column in group_column] if isinstance(group_column, list) else df[group_column]
+    return df[(df[value_column] == target_value).groupby(keys, observed=True).transform('any')]
 
 def explore_amount_of_configs(df):
     # Count RunConfigs per Spec
-    config_counts = df.groupby('Spec')['RunConfig'].count()
+    config_counts = df.groupby('Spec', observed=True)['RunConfig'].count()
     print(f"\nUnique counts of RunConfigs per Spec: {config_counts.unique()}")
 
 
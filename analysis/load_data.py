@@ -1,10 +1,95 @@
+import hashlib
 import os
+import pickle
 import pandas as pd
 import numpy as np
 
-def load_data_mult(csv_dir = './analysis_csv/'):
+from parsed_columns import parse_columns, concat_parsed
+
+# Declared dtypes of the result columns, the other columns are left to pandas. Groupbys and
+# pivots on the category columns pass observed=True: before pandas 3 the default adds a row
+# for every combination of categories, observed or not
+CATEGORY_COLUMNS = ['Spec', 'RunConfig', 'ActionType', 'Result']
+INT_COLUMNS = ['TIMEOUT', 'INITIAL_BDD_TIME', 'HEURISTICS_TIME', 'SECOND_STEP_TIME', 'PARALLEL_OVERHEAD_TIME',
+               'WORK_TIME', 'TOTAL_TIME', 'PRE_ROYBDD_NODE_SIZE', 'POST_HEURISTICS_NODE_SIZE',
+               'POST_SECOND_STEP_NODE_SIZE', 'POST_WORK_NODE_SIZE', 'REORDER_CALL_AMOUNT', 'REAL_CASES',
+               'UNREAL_CASES', 'REAL_TIME', 'UNREAL_TIME']
+FLOAT_COLUMNS = ['TOTAL_REORDER_TIME', 'AVERAGE_REORDER_TIME', 'AVERAGE_REORDER_GAIN']
+SCHEMA = {**dict.fromkeys(CATEGORY_COLUMNS, 'category'), **dict.fromkeys(INT_COLUMNS, 'int64'),
+          **dict.fromkeys(FLOAT_COLUMNS, 'float64')}
+
+# Parsed files are kept in <csv_dir>/.cache/<name>.pkl. A pickle and not Parquet: the
+# *_SAT counts are integers beyond 64 bits, and pyarrow is not a dependency here.
+CACHE_DIR = '.cache'
+
+
+def file_hash(file_path):
+    with open(file_path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def read_typed_csv(file_path, columns=None, name=None):
+    # file_path: a path or a buffer, name: what warnings call it
+    usecols = None if columns is None else lambda column: column in columns
+    dtype = SCHEMA if columns is None else {k: v for k, v in SCHEMA.items() if k in columns}
+    try:
+        return pd.read_csv(file_path, usecols=usecols, dtype=dtype)
+    except (ValueError, TypeError) as e:
+        # e.g. an empty timing cell in an interrupted run, those columns stay as pandas infers them
+        print(f"Warning: {name or os.path.basename(file_path)} does not fit the declared dtypes ({str(e)}), inferring them")
+        return pd.read_csv(file_path, usecols=usecols)
+
+
+def write_cache_entry(cache_path, entry):
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    with open(cache_path + '.tmp', 'wb') as f:
+        pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(cache_path + '.tmp', cache_path)
+
+
+def read_cached_csv(file_path, columns=None, use_cache=True, parsed=False):
+    # The whole typed file comes from the cache when the CSV is unchanged (same mtime and size,
+    # or same content); a miss parses only the requested columns and caches full reads only.
+    # parsed: also return the parsed_columns side table of the file, cached with it
+    cache_path = os.path.join(os.path.dirname(file_path), CACHE_DIR, os.path.basename(file_path) + '.pkl')
+    stat = os.stat(file_path)
+    if use_cache and os.path.exists(cache_path):
+        with open(cache_path, 'rb') as f:
+            entry = pickle.load(f)
+        if (entry['mtime_ns'], entry['size']) == (stat.st_mtime_ns, stat.st_size) or \
+                (entry['size'] == stat.st_size and entry['sha1'] == file_hash(file_path)):
+            if parsed and 'parsed' not in entry:
+                # Cached before the side table existed
+                entry['parsed'] = parse_columns(entry['frame'])
+                write_cache_entry(cache_path, entry)
+            df = entry['frame']
+            df = df if columns is None else df[[column for column in df.columns if column in columns]]
+            return (df, entry['parsed']) if parsed else df
+
+    df = read_typed_csv(file_path, columns)
+    side_table = parse_columns(df) if parsed or (use_cache and columns is None) else None
+    if use_cache and columns is None:
+        write_cache_entry(cache_path, {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size,
+                                       'sha1': file_hash(file_path), 'frame': df, 'parsed': side_table})
+    return (df, side_table) if parsed else df
+
+
+def set_category_columns(df):
+    # Files with different categories concatenate to plain strings
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns and df[column].dtype != 'category':
+            df[column] = df[column].astype('category')
+    return df
+
+
+def load_data_mult(csv_dir = './analysis_csv/', columns=None, use_cache=True, parsed=False):
+    # columns: only load these (Spec is always loaded), use_cache: see read_cached_csv,
+    # parsed: return (df, parsed columns of df), see parsed_columns
     dataframes = []
+    side_tables = []
     all_specs = set()
+    if columns is not None:
+        columns = set(columns) | {'Spec'}
 
     # Get a list of all CSV files in the 'analysis_csv' directory
     csv_files = [file for file in os.listdir(csv_dir) if file.endswith('.csv')]
@@ -17,7 +102,11 @@ def load_data_mult(csv_dir = './analysis_csv/'):
 
     for filename in csv_files:
         file_path = os.path.join(csv_dir, filename)
-        df = pd.read_csv(file_path)
+        if parsed:
+            df, side_table = read_cached_csv(file_path, columns, use_cache, parsed=True)
+            side_tables.append(side_table)
+        else:
+            df = read_cached_csv(file_path, columns, use_cache)
 
         if 'Spec' not in df.columns:
             raise ValueError(f"Error: {filename} does not contain a 'Spec' column. All files must have a 'Spec' column.")
@@ -35,11 +124,13 @@ def load_data_mult(csv_dir = './analysis_csv/'):
         print("No valid files were loaded.")
         return None
 
-    final_df = pd.concat(dataframes, ignore_index=True)
+    final_df = set_category_columns(pd.concat(dataframes, ignore_index=True))
     print(f"Total number of files loaded: {len(dataframes)}")
     print(f"Total Specs: {len(set(final_df['Spec']))}")
     print(f"Final DataFrame shape: {final_df.shape}")
 
+    if parsed:
+        return final_df, concat_parsed(side_tables)
     return final_df
 
 def load_data(name):
@@ -56,4 +147,4 @@ def load_data(name):
         return df
     except Exception as e:
         print(f"Error loading {name}: {str(e)}")
-        return None
\ No newline at end of file
+        return None
@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+
+# The structured text columns of the results, parsed once:
+#   CONFIG_TXT   "TEMP: false, GROUP_AUX: GROUP_PAIR, ..." -> one column per option,
+#                true/false options as bool, the others as categories
+#   *_ORDER      "[57, 55, 5, ...]" -> TokenLists of the variable indices, in order
+#   patterns     "[REMOVED_VAR, REMOVED_HOLE]" -> TokenLists of interned token ids
+# Every distinct string is parsed once, rows only point to it. load_data keeps the
+# parsed columns of each CSV in its cache:
+#   df, parsed = load_data.load_data_mult(parsed=True)
+#   df[parsed['config']['MEMORYLESS']]
+#   df[parsed['lists']['REDUCED_PATTERN'].contains('REMOVED_HOLE')]
+
+CONFIG_COLUMN = 'CONFIG_TXT'
+ORDER_COLUMNS = ['PRE_ROYBDD_ORDER', 'POST_HEURISTICS_ORDER', 'POST_SECOND_STEP_ORDER', 'POST_WORK_ORDER']
+TOKEN_COLUMNS = ['UNIQUE_PATTERNS', 'REDUCED_PATTERN', 'REDUCED_TRIGGER']
+
+
+def split_tokens(text):
+    # The items patterns_triggers.string_to_set finds, in order and without the empty one of "[]"
+    text = text.strip('{}').replace("'", "").replace('[', '').replace(']', '')
+    return [token.strip() for token in text.split(',') if token.strip()]
+
+
+class TokenLists:
+    # A list column stored once per distinct value: row r holds list codes[r] (-1 when the cell
+    # is empty), list k is ids[offsets[k]:offsets[k + 1]], and id j stands for vocabulary[j]
+    # (order columns have no vocabulary, their ids are the variable indices)
+    def __init__(self, codes, offsets, ids, vocabulary=None):
+        self.codes = codes
+        self.offsets = offsets
+        self.ids = ids
+        self.vocabulary = vocabulary
+        self.token_ids = None if vocabulary is None else {token: i for i, token in enumerate(vocabulary)}
+
+    @staticmethod
+    def parse(series, numeric=False):
+        codes, values = pd.factorize(series)
+        lists = [split_tokens(text) for text in values]
+        if numeric:
+            vocabulary = None
+            ids = [int(token) for tokens in lists for token in tokens]
+        else:
+            interned = {}
+            ids = [interned.setdefault(token, len(interned)) for tokens in lists for token in tokens]
+            vocabulary = list(interned)
+        offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(tokens) for tokens in lists])
+        return TokenLists(pd.Series(codes.astype(np.int32), index=series.index), offsets,
+                          np.array(ids, dtype=np.int32), vocabulary)
+
+    @staticmethod
+    def concat(parts):
+        # One TokenLists for the concatenated frames (index reset), ids moved into one vocabulary
+        interned = None if parts[0].vocabulary is None else {}
+        codes, ids, lengths = [], [], []
+        num_lists = 0
+        for part in parts:
+            part_ids = part.ids
+            if interned is not None:
+                remap = np.array([interned.setdefault(token, len(interned)) for token in part.vocabulary],
+                                 dtype=np.int32)
+                part_ids = remap[part_ids]
+            part_codes = part.codes.to_numpy()
+            codes.append(np.where(part_codes < 0, -1, part_codes + num_lists).astype(np.int32))
+            ids.append(part_ids)
+            lengths.append(np.diff(part.offsets))
+            num_lists += len(part.offsets) - 1
+        offsets = np.zeros(num_lists + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.concatenate(lengths))
+        vocabulary = None if interned is None else list(interned)
+        return TokenLists(pd.Series(np.concatenate(codes)), offsets, np.concatenate(ids), vocabulary)
+
+    def contains(self, token):
+        # Boolean Series aligned with the frame, True where the list holds token
+        token_id = token if self.vocabulary is None else self.token_ids.get(token)
+        # One slot per distinct list and a last False one, where the -1 codes of empty cells land
+        found = np.zeros(len(self.offsets), dtype=bool)
+        if token_id is not None:
+            owners = np.repeat(np.arange(len(self.offsets) - 1), np.diff(self.offsets))
+            found[owners[self.ids == token_id]] = True
+        return pd.Series(found[self.codes.to_numpy()], index=self.codes.index)
+
+    def tokens(self):
+        # The lists themselves, a Series of lists of tokens (NaN for empty cells)
+        lists = [self.ids[start:end] for start, end in zip(self.offsets[:-1], self.offsets[1:])]
+        if self.vocabulary is not None:
+            lists = [[self.vocabulary[i] for i in ids] for ids in lists]
+        else:
+            lists = [ids.tolist() for ids in lists]
+        return pd.Series([lists[code] if code >= 0 else np.nan for code in self.codes], index=self.codes.index,
+                         dtype=object)
+
+
+def parse_config(series):
+    # One column per CONFIG_TXT option, bool for true/false options and categories for the others
+    codes, values = pd.factorize(series)
+    options = [dict(item.split(': ', 1) for item in text.split(', ') if ': ' in item) for text in values]
+    # A last all-NaN row for the -1 codes of empty cells
+    table = pd.DataFrame(options + [{}]).iloc[codes].set_axis(series.index)
+    for column in table.columns:
+        lower = table[column].str.lower()
+        if lower.isin(['true', 'false']).all():
+            table[column] = lower == 'true'
+        elif lower.dropna().isin(['true', 'false']).all():
+            table[column] = lower.map({'true': True, 'false': False}).astype('boolean')
+        else:
+            table[column] = table[column].astype('category')
+    return table
+
+
+def parse_columns(df):
+    # {'config': option columns of CONFIG_TXT, 'lists': {column: TokenLists}} of the columns df has
+    config = parse_config(df[CONFIG_COLUMN]) if CONFIG_COLUMN in df.columns else pd.DataFrame(index=df.index)
+    lists = {column: TokenLists.parse(df[column], numeric=column in ORDER_COLUMNS)
+             for column in ORDER_COLUMNS + TOKEN_COLUMNS if column in df.columns}
+    return {'config': config, 'lists': lists}
+
+
+def concat_parsed(parts):
+    # Parsed columns of concatenated frames (pd.concat with ignore_index=True)
+    config = pd.concat([part['config'] for part in parts], ignore_index=True)
+    for column in config.columns:
+        # Options missing from some files, or categories that differ between them
+        if config[column].dtype == object and config[column].dropna().isin([True, False]).all():
+            config[column] = config[column].astype('boolean')
+        elif config[column].dtype != bool and config[column].dtype != 'boolean':
+            config[column] = config[column].astype('category')
+    columns = [column for column in parts[0]['lists'] if all(column in part['lists'] for part in parts)]
+    lists = {column: TokenLists.concat([part['lists'][column] for part in parts]) for column in columns}
+    return {'config': config, 'lists': lists}
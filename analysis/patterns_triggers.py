@@ -1,5 +1,4 @@
-import pandas as pd
-import numpy as np
+from parsed_columns import TokenLists
 
 def string_to_set(s):
     try:
@@ -14,11 +13,12 @@ def string_to_set(s):
         raise ValueError(f"Error parsing string to set: {e}")
 
 def get_prop(df, column, values):
-    pattern_set_col = df[column].apply(string_to_set)
+    # Every distinct string of the column is parsed once, membership is then a lookup per value
+    pattern_lists = TokenLists.parse(df[column])
     total_rows = len(df)
 
     for val in values:
-        specs_with_value = pattern_set_col.apply(lambda x: val in x)
+        specs_with_value = pattern_lists.contains(val)
         count = specs_with_value.sum()
         if total_rows == 0:
             prop = 0
@@ -5,7 +5,7 @@ import numpy as np
 
 
 def pivot(df, columns):
-    pivot_df = df.pivot_table(index='Spec', columns='RunConfig', values=columns)
+    pivot_df = df.pivot_table(index='Spec', columns='RunConfig', values=columns, observed=True)
     return pivot_df
 
 
@@ -73,24 +73,9 @@ def print_headtohead_ratio(geometric_averages, columns, runconfigs, baseline='NO
 
 
 def add_label_column(df):
-    # Function to process each 'Spec' group
-    def process_spec_group(group):
-        # Get the baseline 'WORK_TIME' for 'NOTHING' RunConfig
-        baseline_work_time = group[group['RunConfig'] == 'NOTHING']['WORK_TIME']
-        if baseline_work_time.empty:
-            # If 'NOTHING' RunConfig is not present, assign label 0 to all
-            group['label'] = 0
-        else:
-            # Use the mean WORK_TIME if multiple entries exist
-            baseline_work_time = baseline_work_time.mean()
-            # Assign labels based on comparison
-            group['label'] = group.apply(
-                lambda row: int(row['WORK_TIME'] < baseline_work_time) if row['RunConfig'] != 'NOTHING' else 0,
-                axis=1
-            )
-        return group
-
-    # Apply the function to each 'Spec' group
-    df = df.groupby('Spec', group_keys=False).apply(process_spec_group)
-
-    return df
+    # label 1 when WORK_TIME beats the mean WORK_TIME of the 'NOTHING' RunConfig of the same Spec,
+    # 0 for the 'NOTHING' runs and for Specs without one
+    baseline = df[df['RunConfig'] == 'NOTHING'].groupby('Spec', observed=True)['WORK_TIME'].mean().rename('BASELINE_WORK_TIME')
+    baseline_work_time = df[['Spec']].merge(baseline.reset_index(), on='Spec', how='left')['BASELINE_WORK_TIME']
+    faster = (df['WORK_TIME'].to_numpy() < baseline_work_time.to_numpy()) & (df['RunConfig'] != 'NOTHING')
+    return df.assign(label=faster.astype(int))
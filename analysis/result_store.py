@@ -0,0 +1,179 @@
+import argparse
+import csv
+import io
+import itertools
+import os
+import sqlite3
+
+import pandas as pd
+
+from load_data import read_typed_csv, set_category_columns
+from parsed_columns import parse_columns
+
+# Append-only store of the result CSVs, so an analysis does not parse every CSV again:
+#   python result_store.py ingest [csv_dir]    add the CSVs of csv_dir that are not in the store yet
+#   python result_store.py info                files and runs in the store
+#   df = load_store(action_types=['WELL_SEPARATION'], timeout=0, columns=['WORK_TIME'])
+# Every CSV row is kept as written, next to its key columns. The filters of load_store
+# are answered from the indexes on those, and only the matching rows are parsed, with
+# the dtypes of load_data.
+
+STORE_PATH = './analysis_csv/results.sqlite'
+KEY_COLUMNS = ['Spec', 'RunConfig', 'UniqueIdentifier', 'ActionType', 'TIMEOUT']
+
+
+def connect(store_path=STORE_PATH):
+    db = sqlite3.connect(store_path, timeout=30, isolation_level=None)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY, name TEXT UNIQUE, size INTEGER, "
+               "mtime_ns INTEGER, header TEXT, runs INTEGER)")
+    db.execute("CREATE TABLE IF NOT EXISTS runs (file_id INTEGER, line INTEGER, Spec TEXT, RunConfig TEXT, "
+               "UniqueIdentifier TEXT, ActionType TEXT, TIMEOUT INTEGER, row TEXT, PRIMARY KEY (file_id, line))")
+    db.execute("CREATE INDEX IF NOT EXISTS runs_key ON runs(Spec, RunConfig, UniqueIdentifier)")
+    db.execute("CREATE INDEX IF NOT EXISTS runs_filter ON runs(ActionType, RunConfig, TIMEOUT)")
+    return db
+
+
+def csv_line(values):
+    out = io.StringIO()
+    csv.writer(out, lineterminator='').writerow(values)
+    return out.getvalue()
+
+
+def read_runs(file_path):
+    # Header line and (key values..., row) of every run of a result CSV
+    with open(file_path, 'r', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        missing = [column for column in KEY_COLUMNS if column not in header]
+        if missing:
+            raise ValueError(f"{os.path.basename(file_path)} does not contain the columns {missing}")
+        positions = [header.index(column) for column in KEY_COLUMNS]
+        runs = []
+        for row in reader:
+            if not row:
+                continue
+            keys = [row[i] or None for i in positions]
+            keys[-1] = None if keys[-1] is None else int(float(keys[-1]))
+            runs.append(keys + [csv_line(row)])
+    return csv_line(header), runs
+
+
+def ingest_file(db, file_path):
+    # Returns the number of runs added, 0 for a file already in the store
+    name = os.path.basename(file_path)
+    stat = os.stat(file_path)
+    seen = db.execute("SELECT size, mtime_ns FROM files WHERE name = ?", (name,)).fetchone()
+    if seen is not None:
+        if tuple(seen) != (stat.st_size, stat.st_mtime_ns):
+            print(f"Warning: {name} changed since it was ingested, the store keeps the first version. "
+                  f"Write new runs to a new file.")
+        return 0
+
+    header, runs = read_runs(file_path)
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        # Same rule as load_data_mult: a Spec belongs to a single file
+        db.execute("CREATE TEMP TABLE IF NOT EXISTS new_specs (Spec TEXT PRIMARY KEY)")
+        db.execute("DELETE FROM new_specs")
+        db.executemany("INSERT OR IGNORE INTO new_specs VALUES (?)", ((run[0],) for run in runs))
+        overlap = {spec for spec, in db.execute("SELECT DISTINCT Spec FROM runs JOIN new_specs USING (Spec)")}
+        if overlap:
+            raise ValueError(f"{name} contains 'Spec' values that are already in the store. {overlap}")
+        file_id = db.execute("INSERT INTO files (name, size, mtime_ns, header, runs) VALUES (?, ?, ?, ?, ?)",
+                             (name, stat.st_size, stat.st_mtime_ns, header, len(runs))).lastrowid
+        db.executemany("INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                       ((file_id, line, *run) for line, run in enumerate(runs)))
+        db.execute("COMMIT")
+    except Exception:
+        db.execute("ROLLBACK")
+        raise
+    return len(runs)
+
+
+def ingest(csv_dir='./analysis_csv/', store_path=STORE_PATH):
+    db = connect(store_path)
+    csv_files = sorted(file for file in os.listdir(csv_dir) if file.endswith('.csv'))
+    added = 0
+    for filename in csv_files:
+        try:
+            count = ingest_file(db, os.path.join(csv_dir, filename))
+        except (ValueError, csv.Error) as e:
+            print(f"Error: {str(e)}. Skipping.")
+            continue
+        if count:
+            print(f"Ingested: {filename} ({count} runs)")
+            added += 1
+    print(f"{added} new file(s) of {len(csv_files)} in {csv_dir}")
+    db.close()
+
+
+def load_store(store_path=STORE_PATH, action_types=None, run_configs=None, timeout=None, specs=None,
+               columns=None, parsed=False):
+    # action_types, run_configs, specs: keep runs with one of these values, timeout: 0 or 1,
+    # columns: only parse these (Spec is always loaded), parsed: return (df, parsed columns of df)
+    if not os.path.exists(store_path):
+        print(f"Error: {store_path} does not exist, run `python result_store.py ingest` first.")
+        return None
+    if columns is not None:
+        columns = set(columns) | {'Spec'}
+
+    conditions, params = [], []
+    for column, values in (('ActionType', action_types), ('RunConfig', run_configs), ('Spec', specs)):
+        if values is not None:
+            values = list(values)
+            conditions.append(f"runs.{column} IN ({', '.join('?' * len(values))})")
+            params += values
+    if timeout is not None:
+        conditions.append("runs.TIMEOUT = ?")
+        params.append(int(timeout))
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    db = connect(store_path)
+    rows = db.execute(f"SELECT files.header, runs.row FROM runs JOIN files ON files.id = runs.file_id {where} "
+                      f"ORDER BY runs.file_id, runs.line", params).fetchall()
+    db.close()
+    if not rows:
+        print("No runs in the store match the filters.")
+        return None
+
+    # One parse per run of consecutive rows with the same header
+    dataframes = []
+    for header, group in itertools.groupby(rows, key=lambda row: row[0]):
+        text = '\n'.join(itertools.chain([header], (row for _, row in group)))
+        dataframes.append(read_typed_csv(io.StringIO(text), columns, name=store_path))
+
+    final_df = set_category_columns(pd.concat(dataframes, ignore_index=True))
+    print(f"Loaded {len(final_df)} runs of {len(set(final_df['Spec']))} Specs from {store_path}")
+    if parsed:
+        return final_df, parse_columns(final_df)
+    return final_df
+
+
+def info(store_path=STORE_PATH):
+    db = connect(store_path)
+    for name, runs in db.execute("SELECT name, runs FROM files ORDER BY id"):
+        print(f"{name}: {runs} runs")
+    total, specs = db.execute("SELECT COUNT(*), COUNT(DISTINCT Spec) FROM runs").fetchone()
+    print(f"Total: {total} runs of {specs} Specs")
+    db.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Append-only store of the result CSVs")
+    parser.add_argument('command', choices=['ingest', 'info'])
+    parser.add_argument('csv_dir', nargs='?', default='./analysis_csv/', help="directory of the CSVs to ingest")
+    parser.add_argument('--store', default=STORE_PATH, help="store path")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.command == 'ingest':
+        ingest(args.csv_dir, args.store)
+    else:
+        info(args.store)
+
+
+if __name__ == "__main__":
+    main()
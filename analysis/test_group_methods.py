@@ -0,0 +1,82 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import group_methods
+from helper_methods import get_df_rows_timeout, get_df_rows_no_timeout
+from load_data import load_data_mult
+
+CSV_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'analysis_csv')
+
+
+def reference_group(df):
+  # group as it was written with one Python callable per group, the reference of the vectorized one
+  def check_all_equal(series):
+      if series.nunique() == 1:
+          return series.iloc[0]
+      else:
+          return 'INCONSISTENT'
+
+  def custom_null_agg(series):
+      non_null = series.dropna()
+      if non_null.empty:
+          return np.nan
+      elif non_null.nunique() == 1:
+          return non_null.iloc[0]
+      else:
+          return 'INCONSISTENT'
+
+  def and_relation(series):
+      if series.isin([0, 1, True, False]).all():
+          return all(series)
+      else:
+          return 'INCONSISTENT'
+
+  def or_relation(series):
+      if series.isin([0, 1, True, False]).all():
+          return any(series)
+      else:
+          return 'INCONSISTENT'
+
+  df_no_timeout = get_df_rows_no_timeout(df)
+  df_timeout = get_df_rows_timeout(df)
+
+  agg_dict = {col: custom_null_agg for col in group_methods.null_columns}
+  agg_dict.update({col: 'mean' for col in group_methods.mean_columns})
+  agg_dict.update({col: check_all_equal for col in group_methods.equal_columns})
+  agg_dict.update({col: and_relation for col in group_methods.AND_relation_columns})
+  agg_dict.update({col: or_relation for col in group_methods.OR_relation_columns})
+
+  df_aggregated_no_timeout = df_no_timeout.groupby(['Spec', 'RunConfig'], observed=True).agg(agg_dict).reset_index()
+  df_combined = pd.concat([df_aggregated_no_timeout, df_timeout], ignore_index=True)
+  return df_combined.sort_values(['Spec', 'RunConfig']).reset_index(drop=True)
+
+
+@pytest.fixture(scope='module')
+def runs():
+  return load_data_mult(CSV_DIR, use_cache=False)
+
+
+def test_group_matches_reference(runs):
+  pd.testing.assert_frame_equal(group_methods.group(runs), reference_group(runs))
+
+
+def test_group_marks_inconsistent_runs():
+  # Two runs of one Spec that disagree on every kind of column, and one consistent Spec
+  df = pd.DataFrame({
+    'Spec': ['a', 'a', 'b', 'b'],
+    'RunConfig': ['c', 'c', 'c', 'c'],
+    'TIMEOUT': [0, 0, 0, 0],
+    'Result': ['SAT', 'UNSAT', 'SAT', 'SAT'],
+    'PRE_ROYBDD_ORDER': ['[1, 2]', '[2, 1]', '[1, 2]', np.nan],
+    'SWAPPED_TO_ORIGINAL': [0, 2, 1, 0],
+    'WORK_TIME': [1.0, 3.0, 2.0, 2.0],
+  })
+  columns = {'null_columns': ['PRE_ROYBDD_ORDER'], 'mean_columns': ['WORK_TIME'],
+             'equal_columns': ['Result', 'TIMEOUT'], 'OR_relation_columns': ['SWAPPED_TO_ORIGINAL']}
+  with pytest.MonkeyPatch.context() as patch:
+    for name, value in columns.items():
+      patch.setattr(group_methods, name, value)
+    pd.testing.assert_frame_equal(group_methods.group(df), reference_group(df))
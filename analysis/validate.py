@@ -3,7 +3,7 @@ import numpy as np
 
 def verify_columns_same_in_groups(df, columns, name):
     # Group by Spec and Action
-    grouped = df.groupby(['Spec', 'ActionType'])
+    grouped = df.groupby(['Spec', 'ActionType'], observed=True)
 
     def verify_single_column(column):
         def check_group(group):
@@ -46,7 +46,7 @@ def verify_columns_same_in_groups(df, columns, name):
 
 def verify_columns_permutations_in_groups(df, columns, name):
     # Group by Spec and ActionType
-    grouped = df.groupby(['Spec', 'ActionType'])
+    grouped = df.groupby(['Spec', 'ActionType'], observed=True)
 
     def verify_single_column(column):
         def check_group(group):
@@ -0,0 +1,301 @@
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import platform
+import random
+import re
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import main
+import profiling
+from bipartite_graph import CSRBipartiteGraph
+from fast_metrics import compute_graph_data_fast
+
+# Benchmark of the clustering pipeline:
+#   python bench.py                        synthetic graphs of growing size
+#   python bench.py --replay 20            graphs shaped like the specs of graph_data.csv
+#   python bench.py --compare old.json     flag stages/methods whose median got slower
+# Every graph goes through the stages of do_clustering (load, projection, every
+# method, postprocess, save) and the info command (the fast variant, and the exact
+# one up to EXACT_INFO_MAX_EDGES edges or with --exact-info), `--repeats` times.
+# The random graphs are connected whenever their edge count allows it, as the exact
+# info command needs.
+# The methods are loaded and run once before the first timed pass. The report
+# has latency percentiles, throughput in edges per second and peak memory per
+# stage and method, and is saved as JSON for later comparison.
+
+# (group 0 size, group 1 size, average degree of a group 0 node), INPUT.txt has about 70 x 60 nodes
+SYNTHETIC_SIZES = [
+    (50, 20, 3),
+    (200, 60, 4),
+    (1000, 300, 4),
+    (3000, 1000, 6),
+]
+DEFAULT_METHODS = ["bipartite_BiMLPA", "bipartite_CONDOR", "unipartite_Louvain", "unipartite_DER"]
+GRAPH_DATA_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'analysis', 'additional_data',
+                              'graph_data.csv')
+# A stage or method is reported as a regression when its median grows by more than this factor,
+# and by more than this many seconds so millisecond stages do not trip on noise
+REGRESSION_FACTOR = 1.2
+REGRESSION_MIN_SECONDS = 0.01
+# The exact info command computes betweenness and other all-pairs metrics, above this many
+# edges it takes longer than the rest of the pipeline and only runs with --exact-info
+EXACT_INFO_MAX_EDGES = 1000
+
+
+def spanning_pairs(n0, n1):
+    # Edges of a spanning tree of the complete bipartite graph, as pair ids i * n1 + j: the side
+    # that is behind moves one node ahead and joins the current node of the other side
+    i = j = 0
+    pairs = [0]
+    while i < n0 - 1 or j < n1 - 1:
+        if j == n1 - 1 or (i < n0 - 1 and (i + 1) * n1 <= (j + 1) * n0):
+            i += 1
+        else:
+            j += 1
+        pairs.append(i * n1 + j)
+    return pairs
+
+
+def graph_text(methods, n0, n1, m, seed):
+    # Random bipartite graph in the INPUT.txt layout, m distinct edges. Connected when m allows it,
+    # the exact info command (eigenvector centrality) does not run on disconnected graphs
+    rng = random.Random(seed)
+    m = min(m, n0 * n1)
+    if m >= n0 + n1 - 1:
+        # m distinct samples hold at least m - len(tree) pairs outside the tree
+        pairs = dict.fromkeys(spanning_pairs(n0, n1))
+        for p in rng.sample(range(n0 * n1), m):
+            if len(pairs) == m:
+                break
+            pairs[p] = None
+    else:
+        pairs = rng.sample(range(n0 * n1), m)
+    edges = '\n'.join(f"{p // n1} {n0 + p % n1}" for p in pairs)
+    return f"{' '.join(methods)}\n{' '.join(map(str, range(n0)))}\n{' '.join(map(str, range(n0, n0 + n1)))}\n{edges}"
+
+
+def synthetic_graphs(methods, seed=0):
+    for n0, n1, degree in SYNTHETIC_SIZES:
+        yield f"synthetic_{n0}x{n1}_d{degree}", graph_text(methods, n0, n1, n0 * degree, seed)
+
+
+def parse_graph_data(value):
+    # GRAPH_DATA cells look like "{num_nodes=126, num_edges=259, ...}"
+    return {key: float(number) for key, number in re.findall(r'(\w+)=([-\d.eE]+)', value)}
+
+
+def replay_graphs(methods, count, path=GRAPH_DATA_CSV, seed=0):
+    # The spec graphs are not shipped, their sizes are: random graphs with the same set sizes
+    # and edge count, picked evenly over the range of edge counts
+    with open(path, 'r', newline='') as f:
+        rows = [(row['Spec'], parse_graph_data(row['GRAPH_DATA'])) for row in csv.DictReader(f) if row['GRAPH_DATA']]
+    rows = [(spec, data) for spec, data in rows if data.get('set0_size') and data.get('set1_size')]
+    rows.sort(key=lambda row: row[1]['num_edges'])
+    picks = sorted(set(np.linspace(0, len(rows) - 1, min(count, len(rows))).astype(int).tolist()))
+    for i in picks:
+        spec, data = rows[i]
+        yield spec, graph_text(methods, int(data['set0_size']), int(data['set1_size']), int(data['num_edges']), seed)
+
+
+def run_once(text, methods, timeout, out_dir, exact_info=False):
+    # One pass through the pipeline, returns {stage or method: profiling figures}
+    profile = profiling.new_profile()
+    with profiling.stage(profile, 'load'):
+        graph, _ = CSRBipartiteGraph.from_text(text)
+    with contextlib.redirect_stdout(io.StringIO()):
+        set0_results, set1_results = main.cluster_graph(graph, methods, method_timeout=timeout, profile=profile)
+        with profiling.stage(profile, 'save'):
+            main.save_results(graph, set0_results, os.path.join(out_dir, 'set0.json'))
+            main.save_results(graph, set1_results, os.path.join(out_dir, 'set1.json'))
+    with profiling.stage(profile, 'info_fast'):
+        compute_graph_data_fast(graph)
+    info_error = None
+    if exact_info or graph.number_of_edges() <= EXACT_INFO_MAX_EDGES:
+        # What get_graph_data does, with the file in out_dir
+        try:
+            with profiling.stage(profile, 'info'):
+                metrics = main.compute_graph_data(graph.to_networkx())
+                with open(os.path.join(out_dir, 'graph_metrics.json'), 'w') as f:
+                    json.dump(metrics, f, indent=2, default=main.graph_data_serialize)
+        except Exception as e:
+            # e.g. the eigenvector centrality of a disconnected graph
+            info_error = str(e)
+
+    figures = dict(profile["stages"])
+    figures["sizes"] = profile["sizes"]
+    record = main.profile_record('bench', graph, profile, set0_results, set1_results)
+    for name, method in record["methods"].items():
+        figures[name] = method["run"]
+    for set_name, results in (("set0", set0_results), ("set1", set1_results)):
+        for name, entry in results.items():
+            if 'timeout' in entry:
+                # Named like the methods of profile_record
+                figures[name if name.startswith('bipartite_') else f"{name};{set_name}"] = {"timeout": True}
+    if info_error is not None:
+        figures['info'] = {"error": info_error}
+    return graph, figures
+
+
+def summarize(samples, num_edges):
+    if any("error" in sample for sample in samples):
+        return {"error": next(sample["error"] for sample in samples if "error" in sample), "runs": len(samples)}
+    if any(sample.get("timeout") for sample in samples):
+        return {"timeouts": sum(1 for sample in samples if sample.get("timeout")), "runs": len(samples)}
+    seconds = np.array([sample["ns"] for sample in samples]) / 1e9
+    summary = {
+        "runs": len(samples),
+        "p50_seconds": float(np.percentile(seconds, 50)),
+        "p90_seconds": float(np.percentile(seconds, 90)),
+        "p99_seconds": float(np.percentile(seconds, 99)),
+        "mean_seconds": float(seconds.mean()),
+        "edges_per_second": float(num_edges / seconds.mean()) if seconds.mean() > 0 else None,
+        "peak_rss_bytes": max((sample["peak_rss_bytes"] for sample in samples
+                               if sample["peak_rss_bytes"] is not None), default=None)
+    }
+    if all("traced_peak_bytes" in sample for sample in samples):
+        summary["traced_peak_bytes"] = max(sample["traced_peak_bytes"] for sample in samples)
+    return summary
+
+
+def bench_graph(text, methods, repeats, timeout, out_dir, exact_info=False):
+    if repeats < 1:
+        raise ValueError(f"repeats must be at least 1, got {repeats}")
+    samples = {}
+    for _ in range(repeats):
+        graph, figures = run_once(text, methods, timeout, out_dir, exact_info)
+        sizes = figures.pop("sizes")
+        for key, value in figures.items():
+            samples.setdefault(key, []).append(value)
+    return {
+        "num_nodes": graph.number_of_nodes(),
+        "num_edges": graph.number_of_edges(),
+        # [nodes, edges] of the bipartite graph and of both projections, for the cost model fit
+        "sizes": sizes,
+        "stages": {key: summarize(values, graph.number_of_edges()) for key, values in samples.items()}
+    }
+
+
+def environment(methods, args):
+    versions = {}
+    for module in ('numpy', 'scipy', 'networkx', 'cdlib'):
+        try:
+            versions[module] = __import__(module).__version__
+        except Exception:
+            versions[module] = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "versions": versions,
+        "methods": methods,
+        "repeats": args.repeats,
+        "method_timeout": args.method_timeout,
+        "trace_memory": args.memory,
+        "exact_info": args.exact_info
+    }
+
+
+def compare(baseline, report, factor=REGRESSION_FACTOR):
+    # Median of every graph/stage present in both reports
+    regressions = []
+    for graph_name, current in report["graphs"].items():
+        previous = baseline["graphs"].get(graph_name)
+        if previous is None:
+            continue
+        for stage, summary in current["stages"].items():
+            before = previous["stages"].get(stage, {}).get("p50_seconds")
+            after = summary.get("p50_seconds")
+            if before and after and after > before * factor and after - before > REGRESSION_MIN_SECONDS:
+                regressions.append((graph_name, stage, before, after))
+            elif before and after is None:
+                regressions.append((graph_name, stage, before, float('inf')))
+    return regressions
+
+
+def print_report(report):
+    for graph_name, result in report["graphs"].items():
+        print(f"{graph_name}: {result['num_nodes']} nodes, {result['num_edges']} edges")
+        for stage, summary in result["stages"].items():
+            if "timeouts" in summary:
+                print(f"  {stage:40s} timed out in {summary['timeouts']}/{summary['runs']} runs")
+                continue
+            if "error" in summary:
+                print(f"  {stage:40s} failed: {summary['error']}")
+                continue
+            # No RSS figure where the platform does not report one (profiling.peak_rss)
+            rss = summary['peak_rss_bytes']
+            rss = f"{rss / 2 ** 20:8.1f} MB" if rss is not None else "     n/a"
+            print(f"  {stage:40s} p50 {summary['p50_seconds']:9.4f}s  p90 {summary['p90_seconds']:9.4f}s  "
+                  f"p99 {summary['p99_seconds']:9.4f}s  {summary['edges_per_second'] or 0:12.0f} edges/s  "
+                  f"rss {rss}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark of the clustering pipeline")
+    parser.add_argument('--methods', nargs='+', default=DEFAULT_METHODS, help="clustering methods to run")
+    parser.add_argument('--repeats', type=int, default=5, help="runs per graph")
+    parser.add_argument('--replay', type=int, default=0,
+                        help="also run this many graphs shaped like the specs of graph_data.csv")
+    parser.add_argument('--no-synthetic', action='store_true', help="skip the synthetic graphs")
+    parser.add_argument('--method-timeout', type=float, default=None,
+                        help="wall-clock budget in seconds for each clustering method")
+    parser.add_argument('--memory', action='store_true', help="add tracemalloc peaks, slows the methods down")
+    parser.add_argument('--exact-info', action='store_true',
+                        help=f"also time the exact info command on graphs above {EXACT_INFO_MAX_EDGES} edges")
+    parser.add_argument('--out', default=None, help="report path, defaults to bench_results/bench-<time>.json")
+    parser.add_argument('--compare', default=None, help="earlier report to check the medians against")
+    args = parser.parse_args()
+    if args.repeats < 1:
+        parser.error("--repeats must be at least 1")
+    return args
+
+
+def run_bench():
+    args = parse_args()
+    profiling.enable(trace_memory=args.memory)
+
+    graphs = [] if args.no_synthetic else list(synthetic_graphs(args.methods))
+    if args.replay:
+        graphs += list(replay_graphs(args.methods, args.replay))
+
+    # cdlib and the method backends load on first use, which would land in the first repeat
+    # of the first graph and inflate its p90/p99 (and the cost model fitted on them)
+    with contextlib.redirect_stdout(io.StringIO()):
+        main.preload_methods(
+            main.BipartiteCommunities.select_methods([m for m in args.methods if m.startswith('bipartite_')]) +
+            main.UnipartiteCommunities.select_methods([m for m in args.methods if m.startswith('unipartite_')]),
+            warm=True)
+
+    report = {"environment": environment(args.methods, args), "graphs": {}}
+    with tempfile.TemporaryDirectory() as out_dir:
+        for name, text in graphs:
+            start_time = time.perf_counter()
+            report["graphs"][name] = bench_graph(text, args.methods, args.repeats, args.method_timeout, out_dir,
+                                                 args.exact_info)
+            print(f"{name}: {time.perf_counter() - start_time:.1f}s", file=sys.stderr)
+
+    print_report(report)
+    out = args.out or os.path.join('bench_results', time.strftime('bench-%Y%m%d-%H%M%S.json'))
+    os.makedirs(os.path.dirname(out) or '.', exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Benchmark saved to: {out}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            regressions = compare(json.load(f), report)
+        for graph_name, stage, before, after in regressions:
+            print(f"REGRESSION {graph_name} {stage}: p50 {before:.4f}s -> {after:.4f}s")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    run_bench()
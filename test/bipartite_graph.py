@@ -0,0 +1,318 @@
+import mmap
+import struct
+import warnings
+
+import networkx as nx
+import numpy as np
+import scipy.sparse as sp
+
+
+# Binary graph file, written by the solver instead of INPUT.txt and mapped
+# without parsing (little endian):
+#   magic b'GR1G' | uint32 version | uint32 |group 0| | uint32 |group 1|
+#   | uint32 number of edges | uint32 length of the methods text
+#   methods: UTF-8, separated by spaces like the first line of INPUT.txt,
+#            padded with spaces to a multiple of 8 bytes from the file start
+#   int32 group0[|group 0|] | int32 group1[|group 1|] | int32 edges[2 * number of edges]
+GRAPH_MAGIC = b'GR1G'
+GRAPH_VERSION = 1
+GRAPH_HEADER = struct.Struct('<4sIIIII')
+
+
+def int_array(values):
+    # Integer arrays, the int32 columns of a mapped file included, are used as they are
+    values = np.asarray(values)
+    return values if values.dtype.kind in 'iu' else values.astype(np.int64)
+
+
+def parse_ints(text):
+    # Bulk parse of a whitespace separated block of integers
+    if not text.strip():
+        return np.empty(0, dtype=np.int64)
+    return np.fromstring(text, dtype=np.int64, sep=' ')
+
+
+def tokens_per_line(text):
+    # Number of whitespace separated tokens on every line of text
+    data = np.frombuffer(text.encode(), dtype=np.uint8)
+    newline = data == ord('\n')
+    space = newline | (data == ord(' ')) | (data == ord('\t')) | (data == ord('\r')) | (data == 11) | (data == 12)
+    starts = ~space & np.concatenate(([True], space[:-1]))
+    return np.bincount(np.cumsum(newline)[starts], minlength=int(newline.sum()) + 1)
+
+
+class CSRBipartiteGraph:
+    # Compact form of the constraint/domain graph. Nodes get dense ids in
+    # ascending order of their labels, side[i] tells the group of node i and
+    # the undirected adjacency is kept as CSR (indptr, indices) arrays.
+    # The networkx graph is only built on demand by to_networkx().
+    def __init__(self, group0, group1, edges):
+        # Keep the groups and edges in input order, the networkx view is built from them
+        self.group0 = int_array(group0).ravel()
+        self.group1 = int_array(group1).ravel()
+        self.edges = int_array(edges).reshape(-1, 2)
+        self._nx = None
+
+        self.nodes = np.unique(np.concatenate([self.group0, self.group1])).astype(np.int64, copy=False)
+        n = len(self.nodes)
+
+        # Nodes listed in both groups end up in group 1, like the attribute assignment in networkx
+        self.side = np.ones(n, dtype=np.int8)
+        self.side[np.searchsorted(self.nodes, self.group0)] = 0
+        self.side[np.searchsorted(self.nodes, self.group1)] = 1
+
+        # Every edge endpoint has to be listed in one of the groups
+        ends = np.searchsorted(self.nodes, self.edges)
+        if len(self.edges) and (n == 0 or (self.nodes[np.minimum(ends, n - 1)] != self.edges).any()):
+            raise ValueError("The resulting graph is not bipartite.")
+
+        # Bipartite with respect to the given groups iff no edge stays inside one group
+        if (self.side[ends[:, 0]] == self.side[ends[:, 1]]).any():
+            raise ValueError("The resulting graph is not bipartite.")
+
+        # Orient every edge from group 0 to group 1 and drop duplicates
+        swap = self.side[ends[:, 0]] == 1
+        left = np.where(swap, ends[:, 1], ends[:, 0])
+        right = np.where(swap, ends[:, 0], ends[:, 1])
+        pairs = np.sort(left * n + right)
+        pairs = pairs[np.concatenate([[True], pairs[1:] != pairs[:-1]])] if len(pairs) else pairs
+        self.edge_left = pairs // n if n else pairs
+        self.edge_right = pairs % n if n else pairs
+
+        rows = np.concatenate([self.edge_left, self.edge_right])
+        cols = np.concatenate([self.edge_right, self.edge_left])
+        order = np.argsort(rows, kind='stable')
+        self.indices = cols[order]
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n), out=self.indptr[1:])
+
+    @classmethod
+    def from_text(cls, text):
+        # Same layout as INPUT.txt: methods, group 0, group 1, then one edge per line
+        lines = text.split('\n', 3)
+        lines += [''] * (4 - len(lines))
+        methods = lines[0].split()
+
+        try:
+            # numpy only warns when it stops at a token that is not a number
+            with warnings.catch_warnings():
+                warnings.simplefilter('error', DeprecationWarning)
+                group0 = parse_ints(lines[1])
+                group1 = parse_ints(lines[2])
+                values = parse_ints(lines[3])
+        except (ValueError, DeprecationWarning) as e:
+            raise ValueError(f"Malformed graph: {str(e)}")
+        # The block is parsed as one stream, a line with one or three nodes would shift the pairs
+        tokens = tokens_per_line(lines[3])
+        if len(values) % 2 or not np.all((tokens == 0) | (tokens == 2)):
+            raise ValueError("Malformed graph: every edge line needs exactly two nodes")
+
+        return cls(group0, group1, values.reshape(-1, 2)), methods
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        # Binary layout above, the group and edge arrays stay views of the buffer
+        if len(buffer) < GRAPH_HEADER.size:
+            raise ValueError("Malformed graph: truncated header")
+        magic, version, size0, size1, num_edges, methods_length = GRAPH_HEADER.unpack_from(buffer, 0)
+        if magic != GRAPH_MAGIC or version != GRAPH_VERSION:
+            raise ValueError("Not a binary graph file")
+        offset = GRAPH_HEADER.size
+        methods = bytes(buffer[offset:offset + methods_length]).decode().split()
+        offset += methods_length + (-(offset + methods_length) % 8)
+        if len(buffer) < offset + 4 * (size0 + size1 + 2 * num_edges):
+            raise ValueError("Malformed graph: truncated arrays")
+
+        group0 = np.frombuffer(buffer, dtype='<i4', count=size0, offset=offset)
+        group1 = np.frombuffer(buffer, dtype='<i4', count=size1, offset=offset + 4 * size0)
+        edges = np.frombuffer(buffer, dtype='<i4', count=2 * num_edges, offset=offset + 4 * (size0 + size1))
+        return cls(group0, group1, edges), methods
+
+    @staticmethod
+    def is_binary_file(filename):
+        with open(filename, 'rb') as f:
+            return f.read(len(GRAPH_MAGIC)) == GRAPH_MAGIC
+
+    @classmethod
+    def from_file(cls, filename):
+        # INPUT.txt text or the binary layout, told apart by the magic bytes
+        if not cls.is_binary_file(filename):
+            with open(filename, 'r') as f:
+                return cls.from_text(f.read())
+        with open(filename, 'rb') as f:
+            # The map outlives the file descriptor and is released with the last array using it
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls.from_buffer(buffer)
+
+    def write_binary(self, filename, methods):
+        # What the solver writes, also used to convert INPUT.txt files
+        encoded = ' '.join(methods).encode()
+        header = GRAPH_HEADER.pack(GRAPH_MAGIC, GRAPH_VERSION, len(self.group0), len(self.group1), len(self.edges),
+                                   len(encoded))
+        encoded += b' ' * (-(len(header) + len(encoded)) % 8)
+        with open(filename, 'wb') as f:
+            f.write(header + encoded)
+            for column in (self.group0, self.group1, self.edges):
+                f.write(column.astype('<i4', copy=False).tobytes())
+
+    def number_of_nodes(self):
+        return len(self.nodes)
+
+    def number_of_edges(self):
+        return len(self.edge_left)
+
+    def degrees(self):
+        return np.diff(self.indptr)
+
+    def nodes_of_side(self, value):
+        return self.nodes[self.side == value]
+
+    def node_order(self):
+        # Node labels in the insertion order of the networkx view
+        first = set(self.group0.tolist())
+        return list(first) + [n for n in set(self.group1.tolist()) if n not in first]
+
+    def biadjacency(self):
+        # Sparse |group 0| x |group 1| incidence matrix, rows/columns follow the dense id order
+        ids0 = np.flatnonzero(self.side == 0)
+        ids1 = np.flatnonzero(self.side == 1)
+        position = np.empty(len(self.nodes), dtype=np.int64)
+        position[ids0] = np.arange(len(ids0))
+        position[ids1] = np.arange(len(ids1))
+        data = np.ones(len(self.edge_left), dtype=np.int64)
+        B = sp.csr_matrix((data, (position[self.edge_left], position[self.edge_right])),
+                          shape=(len(ids0), len(ids1)))
+        return B, ids0, ids1
+
+    def overlap_projections(self, threshold=None, top_k=None):
+        # Both overlap weighted projections, weights are |N(u) & N(v)| / |N(u) | N(v)| exactly
+        # as in nx.bipartite.overlap_weighted_projected_graph
+        B, ids0, ids1 = self.biadjacency()
+        order = self.node_order()
+        order_side = self.side[np.searchsorted(self.nodes, np.asarray(order, dtype=np.int64))]
+        nodes_0 = {n for n, s in zip(order, order_side.tolist()) if s == 0}
+        nodes_1 = set(order) - nodes_0
+
+        p0 = self._project(B, ids0, nodes_0, 0, threshold, top_k)
+        p1 = self._project(B.T.tocsr(), ids1, nodes_1, 1, threshold, top_k)
+        return p0, p1
+
+    def _project(self, B, ids, nodes, side, threshold, top_k):
+        # Shared neighbours of every pair of rows, each pair once
+        shared = sp.triu(B @ B.T, k=1).tocoo()
+        degree = np.asarray(B.sum(axis=1)).ravel()
+        rows, cols, common = shared.row, shared.col, shared.data
+        weights = common / (degree[rows] + degree[cols] - common)
+
+        if threshold is not None:
+            keep = weights >= threshold
+            rows, cols, weights = rows[keep], cols[keep], weights[keep]
+        if top_k is not None:
+            keep = top_k_mask(rows, cols, weights, len(ids), top_k)
+            rows, cols, weights = rows[keep], cols[keep], weights[keep]
+
+        labels = self.nodes[ids]
+        P = nx.Graph()
+        P.graph['is_directed'] = False
+        P.add_nodes_from((n, {'bipartite': side}) for n in nodes)
+        P.add_weighted_edges_from(zip(labels[rows].tolist(), labels[cols].tolist(), weights.tolist()))
+        return P
+
+    def apply_delta(self, delta):
+        # Graph after a solver delta
+        #   {"add_nodes": {"group0": [...], "group1": [...]}, "remove_nodes": [...],
+        #    "add_edges": [[u, v], ...], "remove_edges": [[u, v], ...]}
+        # together with the nodes whose neighbourhood may have changed and the removed nodes.
+        # A networkx view of this graph is updated in place and moves to the new graph.
+        add_nodes = delta.get('add_nodes', {})
+        added0 = np.asarray(add_nodes.get('group0', []), dtype=np.int64)
+        added1 = np.asarray(add_nodes.get('group1', []), dtype=np.int64)
+        removed = np.asarray(delta.get('remove_nodes', []), dtype=np.int64)
+        add_edges = np.asarray(delta.get('add_edges', []), dtype=np.int64).reshape(-1, 2)
+        remove_edges = np.asarray(delta.get('remove_edges', []), dtype=np.int64).reshape(-1, 2)
+
+        keep = ~np.isin(self.edges, removed).any(axis=1) & ~isin_edges(self.edges, remove_edges)
+        group0 = np.concatenate([self.group0[~np.isin(self.group0, removed)], added0])
+        group1 = np.concatenate([self.group1[~np.isin(self.group1, removed)], added1])
+        graph = CSRBipartiteGraph(group0, group1, np.concatenate([self.edges[keep], add_edges]))
+
+        changed = np.unique(np.concatenate([self.edges[~keep].ravel(), add_edges.ravel(), added0, added1]))
+        # A node removed and added back by the same delta is a changed node, not a removed one
+        changed = changed[~np.isin(changed, removed[~np.isin(removed, np.concatenate([added0, added1]))])]
+
+        if self._nx is not None:
+            G = self._nx
+            G.remove_nodes_from(removed.tolist())
+            G.remove_edges_from(map(tuple, self.edges[~keep].tolist()))
+            G.add_nodes_from(added0.tolist(), bipartite=0)
+            G.add_nodes_from(added1.tolist(), bipartite=1)
+            G.add_edges_from(map(tuple, add_edges.tolist()))
+            graph._nx, self._nx = G, None
+        return graph, changed, removed
+
+    def update_projections(self, projections, changed, removed, threshold=None):
+        # Only the rows of changed nodes move: the overlap weight of a pair depends
+        # on the neighbourhoods of its two ends alone
+        B, ids0, ids1 = self.biadjacency()
+        node_side = self.side[np.searchsorted(self.nodes, changed)] if len(self.nodes) else changed
+        for side, P, B_side, ids in ((0, projections[0], B, ids0), (1, projections[1], B.T.tocsr(), ids1)):
+            P.remove_nodes_from(removed.tolist())
+            P.remove_nodes_from([n for n in changed[node_side != side].tolist() if n in P])
+
+            rows_nodes = changed[node_side == side]
+            P.remove_edges_from([edge for n in rows_nodes.tolist() if n in P for edge in list(P.edges(n))])
+            P.add_nodes_from((n for n in rows_nodes.tolist() if n not in P), bipartite=side)
+            if not len(rows_nodes):
+                continue
+
+            rows = np.searchsorted(ids, np.searchsorted(self.nodes, rows_nodes))
+            shared = (B_side[rows] @ B_side.T).tocoo()
+            degree = np.asarray(B_side.sum(axis=1)).ravel()
+            row, col, common = shared.row, shared.col, shared.data
+            keep = col != rows[row]
+            row, col, common = row[keep], col[keep], common[keep]
+            weights = common / (degree[rows[row]] + degree[col] - common)
+            if threshold is not None:
+                keep = weights >= threshold
+                row, col, weights = row[keep], col[keep], weights[keep]
+            P.add_weighted_edges_from(zip(rows_nodes[row].tolist(), self.nodes[ids[col]].tolist(), weights.tolist()))
+        return projections
+
+    def to_networkx(self):
+        if self._nx is None:
+            G = nx.Graph()
+            G.graph['is_directed'] = False
+            # Same insertion order as the line-by-line loader, the algorithms are order sensitive
+            G.add_nodes_from(set(self.group0.tolist()), bipartite=0)
+            G.add_nodes_from(set(self.group1.tolist()), bipartite=1)
+            G.add_edges_from(map(tuple, self.edges.tolist()))
+            self._nx = G
+        return self._nx
+
+
+def isin_edges(edges, pairs):
+    # Whether each edge is one of the pairs, in either orientation
+    if not len(edges) or not len(pairs):
+        return np.zeros(len(edges), dtype=bool)
+    ends = np.sort(np.concatenate([edges, pairs]), axis=1)
+    _, index = np.unique(ends, return_inverse=True)
+    index = index.reshape(-1, 2)
+    keys = index[:, 0] * (index.max() + 1) + index[:, 1]
+    return np.isin(keys[:len(edges)], keys[len(edges):])
+
+
+def top_k_mask(rows, cols, weights, n, k):
+    # Keep an edge when it is among the k heaviest edges of either endpoint
+    ends = np.concatenate([rows, cols])
+    edge = np.concatenate([np.arange(len(rows)), np.arange(len(rows))])
+    both_weights = np.concatenate([weights, weights])
+
+    # Sort by endpoint, heaviest first, and rank the edges within each endpoint
+    order = np.lexsort((-both_weights, ends))
+    ends, edge = ends[order], edge[order]
+    starts = np.searchsorted(ends, np.arange(n))
+    rank = np.arange(len(ends)) - starts[ends]
+
+    keep = np.zeros(len(rows), dtype=bool)
+    keep[edge[rank < k]] = True
+    return keep
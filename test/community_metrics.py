@@ -0,0 +1,68 @@
+import numpy as np
+import networkx as nx
+import scipy.sparse as sp
+
+# One pass replacement of the cdlib fitness functions used by calculate_metrics
+# (average_internal_degree, internal_edge_density, scaled_density, hub_dominance
+# and conductance). Every community is a column of a sparse node x community
+# membership matrix M built from the node -> community labels, so with the
+# adjacency A:
+#   internal degree of each member   (A M) .* M
+#   internal edges m_c               column sums of the above / 2
+#   edges leaving the community      degree volume of the members - 2 m_c
+# The per-community scores follow cdlib, including which communities it scores
+# 0 (a division by zero in the plain metrics) and which it leaves out of the
+# mean (a division by zero in scaled density and hub dominance).
+
+
+def membership_matrix(G, communities):
+    index = {node: i for i, node in enumerate(G)}
+    # Label arrays: position of every community member and the community it belongs to
+    pairs = [(index[node], c) for c, comm in enumerate(communities) for node in comm if node in index]
+    nodes = np.fromiter((i for i, _ in pairs), dtype=np.int64, count=len(pairs))
+    labels = np.fromiter((c for _, c in pairs), dtype=np.int64, count=len(pairs))
+    M = sp.csr_matrix((np.ones(len(pairs)), (nodes, labels)), shape=(len(index), len(communities)))
+    # A node listed twice in the same community counts once, like in the subgraph cdlib takes
+    M.data[:] = 1
+    return M
+
+
+def mean_score(values):
+    values = values[~np.isnan(values)]
+    return float(np.mean(values)) if len(values) else None
+
+
+def community_scores(G, communities):
+    n, m = G.number_of_nodes(), G.number_of_edges()
+    A = nx.to_scipy_sparse_array(G, nodelist=list(G), weight=None, format='csr')
+    M = membership_matrix(G, communities)
+
+    inner = (A @ M).multiply(M).tocsc()
+    size = np.asarray(M.sum(axis=0)).ravel()
+    internal_edges = np.asarray(inner.sum(axis=0)).ravel() / 2
+    volume = np.asarray(A.sum(axis=1)).ravel() @ M
+    outside = volume - 2 * internal_edges
+    hub_degree = inner.max(axis=0).toarray().ravel()
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pairs = size * (size - 1)
+        density = np.where(pairs > 0, internal_edges / (pairs / 2), 0.0)
+        graph_density = 2 * m / (n * (n - 1)) if m and n > 1 else 0
+        scaled = (np.where(internal_edges > 0, internal_edges / pairs * 2, 0.0) / graph_density
+                  if graph_density else np.full(len(size), np.nan))
+        cut_volume = 2 * internal_edges + outside
+
+        return {
+            'average_internal_degree': np.where(size > 0, 2 * internal_edges / size, 0.0),
+            'internal_edge_density': density,
+            'scaled_density': scaled,
+            'hub_dominance': np.where(size > 1, hub_degree / (size - 1), np.nan),
+            'conductance': np.where(cut_volume > 0, outside / cut_volume, 0.0)
+        }
+
+
+def community_metrics(G, communities):
+    scores = community_scores(G, communities)
+    metrics = {name: mean_score(values) for name, values in scores.items()}
+    metrics['amount'] = len(communities)
+    return metrics
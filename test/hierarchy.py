@@ -0,0 +1,183 @@
+import argparse
+import heapq
+import json
+from collections import defaultdict
+
+import networkx as nx
+
+import result_format
+
+# Community hierarchies (--hierarchy): one clustering pass gives every level,
+# any of which can be cut later without running the method again.
+#   {"nodes":   node labels,
+#    "base":    cluster id of every node in the finest partition computed,
+#    "merges":  [[a, b], ...], merge t joins clusters a and b into cluster B + t
+#               (B = number of base clusters), finest first,
+#    "levels":  merge counts of the natural levels of the method, finest first,
+#    "default": index of the level the method returns as its flat result}
+# Cutting after k merges leaves B - k communities.
+
+# Every further Girvan-Newman split costs edge betweenness passes until it
+# happens, the hierarchy stops at this many communities
+GIRVAN_NEWMAN_MAX_COMMUNITIES = 32
+
+
+def merge_tree(nodes, partitions):
+    # Hierarchy of a sequence of partitions, each one coarser than the previous one
+    base = {}
+    for c, comm in enumerate(partitions[0]):
+        base.update(dict.fromkeys(comm, c))
+    cluster = {node: base[node] for node in nodes}
+    merges, levels = [], [0]
+    for partition in partitions[1:]:
+        for comm in partition:
+            ids = list(dict.fromkeys(cluster[node] for node in comm))
+            merged = ids[0]
+            for other in ids[1:]:
+                merges.append([merged, other])
+                merged = len(partitions[0]) + len(merges) - 1
+            cluster.update(dict.fromkeys(comm, merged))
+        levels.append(len(merges))
+    return {"nodes": list(nodes), "base": [base[node] for node in nodes], "merges": merges, "levels": levels}
+
+
+def louvain_hierarchy(G, partition=None, weight='weight', resolution=1., randomize=None):
+    # Every aggregation level of Louvain, the last one is what algorithms.louvain returns
+    from cdlib import NodeClustering
+    from community import community_louvain
+    if partition is not None:
+        partition = {node: c for c, comm in enumerate(partition.communities) for node in comm}
+    dendrogram = community_louvain.generate_dendrogram(G, partition, weight=weight, resolution=resolution,
+                                                       randomize=randomize)
+    partitions = []
+    for level in range(len(dendrogram)):
+        coms = defaultdict(list)
+        for node, c in community_louvain.partition_at_level(dendrogram, level).items():
+            coms[c].append(node)
+        partitions.append(list(coms.values()))
+    hierarchy = merge_tree(list(G), partitions)
+    hierarchy["default"] = len(partitions) - 1
+    clustering = NodeClustering(partitions[-1], G, "Louvain",
+                                method_parameters={"weight": weight, "resolution": resolution})
+    return clustering, hierarchy
+
+
+def girvan_newman_hierarchy(G, level=1):
+    # The connected components, then one more community per Girvan-Newman level
+    from cdlib import NodeClustering
+    g = nx.Graph(G)
+    partitions = [list(nx.connected_components(g))]
+    for coms in nx.algorithms.community.girvan_newman(g):
+        partitions.append(list(coms))
+        if len(partitions) > level and len(coms) >= GIRVAN_NEWMAN_MAX_COMMUNITIES:
+            break
+    # Finest first
+    partitions.reverse()
+    hierarchy = merge_tree(list(G), partitions)
+    hierarchy["default"] = max(len(partitions) - 1 - level, 0)
+    coms = [list(c) for c in partitions[hierarchy["default"]]]
+    return NodeClustering(coms, G, "Girvan Newman", method_parameters={"level": level}), hierarchy
+
+
+def merge_order(D):
+    # Paris sorts its merges by distance, and distances that only differ by rounding
+    # can put a merge before the ones building its clusters (paris_best_clustering then
+    # fails with a KeyError). Merges in distance order, each after its children.
+    n = len(D) + 1
+    parents = {}
+    missing = {}
+    ready = []
+    for t, (a, b, d, _) in enumerate(D):
+        pending = [c for c in (int(a), int(b)) if c >= n]
+        for c in pending:
+            parents.setdefault(c, []).append(t)
+        missing[t] = len(pending)
+        if not pending:
+            heapq.heappush(ready, (d, t))
+
+    order, renamed = [], {}
+    while ready:
+        _, t = heapq.heappop(ready)
+        renamed[n + t] = n + len(order)
+        order.append(t)
+        for parent in parents.get(n + t, []):
+            missing[parent] -= 1
+            if not missing[parent]:
+                heapq.heappush(ready, (D[parent][2], parent))
+    D = D[order]
+    D[:, :2] = [[renamed.get(int(c), int(c)) for c in row] for row in D[:, :2]]
+    return D
+
+
+def paris_hierarchy(G):
+    # The whole Paris dendrogram, cut where algorithms.paris cuts it by default
+    from cdlib import NodeClustering
+    from cdlib.algorithms.internal.paris import paris as paris_dendrogram, paris_best_clustering
+    nodes = list(G)
+    D = merge_order(paris_dendrogram(nx.relabel_nodes(G, {n: i for i, n in enumerate(nodes)})))
+    coms = [[nodes[i] for i in com] for com in paris_best_clustering(D)]
+    hierarchy = {
+        "nodes": nodes,
+        "base": list(range(len(nodes))),
+        "merges": [[int(a), int(b)] for a, b in D[:, :2]],
+        "levels": list(range(len(nodes))),
+        "default": len(nodes) - len(coms)
+    }
+    return NodeClustering(coms, G, "Paris", method_parameters={}), hierarchy
+
+
+# Methods with a hierarchy, called with the parameters of UnipartiteCommunities.ALGORITHMS
+# and of the warm start; Leiden does not expose its aggregation levels
+HIERARCHIES = {
+    "unipartite_Louvain": louvain_hierarchy,
+    "unipartite_Girvan-Newman": girvan_newman_hierarchy,
+    "unipartite_Paris": paris_hierarchy
+}
+
+
+def cut_hierarchy(hierarchy, level=None, communities=None):
+    # Communities at a level (index into "levels", negative counts from the coarsest),
+    # at the level with the number of communities closest to `communities`, or at the default
+    num_base = len(set(hierarchy["base"]))
+    levels = hierarchy["levels"]
+    if communities is not None:
+        level = min(range(len(levels)), key=lambda i: abs(num_base - levels[i] - communities))
+    elif level is None:
+        level = hierarchy["default"]
+    merges = hierarchy["merges"][:levels[level]]
+
+    # Clusters are numbered after their children, so one pass from the top resolves every root
+    parent = list(range(num_base + len(merges)))
+    for t, (a, b) in enumerate(merges):
+        parent[a] = parent[b] = num_base + t
+    root = list(parent)
+    for i in range(len(parent) - 1, -1, -1):
+        root[i] = root[parent[i]]
+
+    coms = defaultdict(list)
+    for node, c in zip(hierarchy["nodes"], hierarchy["base"]):
+        coms[root[c]].append(node)
+    return list(coms.values())
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Cut a community hierarchy of a results file")
+    parser.add_argument('results', help="*_set0_results / *_set1_results file written with --hierarchy")
+    parser.add_argument('method', help="result entry, e.g. unipartite_Louvain")
+    parser.add_argument('--level', type=int, default=None, help="level index, 0 is the finest, -1 the coarsest")
+    parser.add_argument('--communities', type=int, default=None,
+                        help="cut at the level with the number of communities closest to this one")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    entry = result_format.load_results(args.results)[args.method]
+    if 'hierarchy' not in entry:
+        print(f"Error: {args.method} has no hierarchy in {args.results}")
+        return
+    print(json.dumps(cut_hierarchy(entry["hierarchy"], args.level, args.communities)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,134 +1,369 @@
 import argparse
+import csv
+import functools
+import glob
 import json
 import time
+import random
 import os
 import networkx as nx
-from cdlib import evaluation, algorithms
 import sys
-import matplotlib.pyplot as plt
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import numpy as np
+import result_cache
+import result_format
+import method_selection
+import hierarchy
+import profiling
+from bipartite_graph import CSRBipartiteGraph
+from community_metrics import community_metrics
+from fast_metrics import compute_graph_data_fast, DEFAULT_PIVOTS
 
 
 #  ==== CLUSTERING METHODS
-class UnipartiteCommunities:
-    @staticmethod
-    def detect_unipartite_communities(G_part, set_number, methods=None):
-        results = {}
+# The method tables name functions of cdlib.algorithms: cdlib imports every optional
+# backend it knows of and takes seconds, so it is only loaded when a method runs
+# (or by preload_methods before worker processes fork)
+def algorithm(name):
+    from cdlib import algorithms
+    return getattr(algorithms, name)
 
-        all_one_mode_algs = {
-            "unipartite_AGDL": (algorithms.agdl, {"number_communities": 2, "kc": None}),
-            "unipartite_DER": (algorithms.der, {}),
-            "unipartite_Girvan-Newman": (algorithms.girvan_newman, {"level": 1}),
-            "unipartite_Leiden": (algorithms.leiden, {}),
-            "unipartite_Louvain": (algorithms.louvain, {}),
-           "unipartite_LSWL": (algorithms.lswl, {}),
-            "unipartite_MCODE": (algorithms.mcode, {}),
-            "unipartite_Paris": (algorithms.paris, {}),
-            "unipartite_RB_POTS": (algorithms.rb_pots, {}),
-            "unipartite_Surprise_Communities": (algorithms.surprise_communities, {}),
-            "unipartite_Threshold_Clustering": (algorithms.threshold_clustering, {}),
-            "unipartite_pycombo":(algorithms.pycombo,{}),
-            "unipartite_bayan":(algorithms.bayan,{})
-        }
 
+def method_input(G, mutates):
+    # Private copy for methods that modify their input, otherwise a frozen view sharing
+    # the graph's dicts: nothing is copied and any structural change raises
+    return G.copy() if mutates else nx.graphviews.generic_graph_view(G)
+
+
+class UnipartiteCommunities:
+    ALGORITHMS = {
+        "unipartite_AGDL": ("agdl", {"number_communities": 2, "kc": None}),
+        "unipartite_DER": ("der", {}),
+        "unipartite_Girvan-Newman": ("girvan_newman", {"level": 1}),
+        "unipartite_Leiden": ("leiden", {}),
+        "unipartite_Louvain": ("louvain", {}),
+        "unipartite_LSWL": ("lswl", {}),
+        "unipartite_MCODE": ("mcode", {}),
+        "unipartite_Paris": ("paris", {}),
+        "unipartite_RB_POTS": ("rb_pots", {}),
+        "unipartite_Surprise_Communities": ("surprise_communities", {}),
+        "unipartite_Threshold_Clustering": ("threshold_clustering", {}),
+        "unipartite_pycombo":("pycombo", {}),
+        "unipartite_bayan":("bayan", {})
+    }
+    # Methods that change the graph they are given: Paris relabels it in place, LSWL
+    # rewrites its edges; bayan is not verified. The others only get a read-only view.
+    MUTATES_INPUT = {"unipartite_Paris", "unipartite_LSWL", "unipartite_bayan"}
+    # Methods that can continue from a previous partition, and the parameter it goes into
+    WARM_START = {
+        "unipartite_Louvain": "partition",
+        "unipartite_Leiden": "initial_membership"
+    }
+
+    @staticmethod
+    def select_methods(methods=None):
         # If no methods specified, use all
         if not methods:
-            methods = list(all_one_mode_algs.keys())
+            return list(UnipartiteCommunities.ALGORITHMS.keys())
 
+        selected = []
         for name in methods:
-            if name in all_one_mode_algs:
-                alg, params = all_one_mode_algs[name]
-                try:
-                    communities = alg(G_part.copy(), **params)
-                    results[name] = {
-                        "communities": communities,
-                    }
-                except Exception as e:
-                    print(f"Failed in " + name)
-                    results[f"{name};{set_number};weighted"] = {"error": str(e)}
-                    
+            if name in UnipartiteCommunities.ALGORITHMS:
+                selected.append(name)
             elif name.startswith("unipartite_"):
                 print(f"Warning: Unknown unipartite method '{name}'. Skipping.")
+        return selected
 
-        return results
-
+    @staticmethod
+    def warm_start_params(name, G_part, communities):
+        # Previous communities restricted to the current nodes, new nodes start on their own
+        label = {}
+        count = 0
+        for comm in communities:
+            members = [node for node in comm if node in G_part and node not in label]
+            if members:
+                label.update(dict.fromkeys(members, count))
+                count += 1
+        for node in G_part:
+            if node not in label:
+                label[node] = count
+                count += 1
+
+        if UnipartiteCommunities.WARM_START[name] == "partition":
+            groups = [[] for _ in range(count)]
+            for node, c in label.items():
+                groups[c].append(node)
+            from cdlib import NodeClustering
+            return {"partition": NodeClustering(groups, G_part, "warm start")}
+        return {"initial_membership": [label[node] for node in G_part]}
 
-class BipartiteCommunities:
     @staticmethod
-    def project_graphs_weighted(G):
-        nodes_0 = {n for n, d in G.nodes(data=True) if d['bipartite'] == 0}
-        nodes_1 = set(G.nodes()) - nodes_0
+    def run_method(name, G_part, initial=None, with_hierarchy=False):
+        # With with_hierarchy, methods of hierarchy.HIERARCHIES return (clustering, hierarchy)
+        alg, params = UnipartiteCommunities.ALGORITHMS[name]
+        if initial is not None and name in UnipartiteCommunities.WARM_START:
+            params = {**params, **UnipartiteCommunities.warm_start_params(name, G_part, initial)}
+        if with_hierarchy and name in hierarchy.HIERARCHIES:
+            return hierarchy.HIERARCHIES[name](method_input(G_part, False), **params)
+        return algorithm(alg)(method_input(G_part, name in UnipartiteCommunities.MUTATES_INPUT), **params)
 
-        p0 = nx.bipartite.overlap_weighted_projected_graph(G, nodes_0)
-        p1 = nx.bipartite.overlap_weighted_projected_graph(G, nodes_1)
+    @staticmethod
+    def add_error(results, name, set_number, error):
+        # Keyed by the method name like the results, every set has its own results file
+        print(f"Failed in {name} on set {set_number}")
+        results[name] = {"error": error}
 
-        return p0, p1
+    @staticmethod
+    def add_timeout(results, name, set_number, timeout):
+        print(f"Timed out in {name} on set {set_number}")
+        results[name] = {"timeout": timeout}
 
     @staticmethod
-    def detect_bipartite_communities(G, methods=None):
+    def detect_unipartite_communities(G_part, set_number, methods=None, timeout=None, warm_start=None,
+                                      with_hierarchy=False):
         results = {}
+        warm_start = warm_start or {}
+
+        for name in UnipartiteCommunities.select_methods(methods):
+            if timeout:
+                entry = run_method_isolated(set_number, name, G_part, timeout, warm_start.get(name), with_hierarchy)
+                record_method_entry(results, set_number, name, entry, G_part)
+                continue
+            try:
+                with profiling.measure() as figures:
+                    communities = UnipartiteCommunities.run_method(name, G_part, warm_start.get(name), with_hierarchy)
+                levels = None
+                if isinstance(communities, tuple):
+                    communities, levels = communities
+                results[name] = {
+                    "communities": communities,
+                }
+                if levels is not None:
+                    results[name]["hierarchy"] = levels
+                if profiling.enabled:
+                    results[name]["profile"] = figures
+            except Exception as e:
+                UnipartiteCommunities.add_error(results, name, set_number, str(e))
+
+        return results
 
-        all_bipartite_algs = {
-            "bipartite_BiMLPA": (algorithms.bimlpa, {}),
-            "bipartite_CONDOR": (algorithms.condor, {}),
-            "bipartite_SPECTRAL": (algorithms.spectral, {'kmax':4})
-        }
 
+class BipartiteCommunities:
+    ALGORITHMS = {
+        "bipartite_BiMLPA": ("bimlpa", {}),
+        "bipartite_CONDOR": ("condor", {}),
+        "bipartite_SPECTRAL": ("spectral", {'kmax':4})
+    }
+    # BiMLPA stores its labels as node attributes
+    MUTATES_INPUT = {"bipartite_BiMLPA"}
+
+    @staticmethod
+    def project_graphs_weighted(graph, threshold=None, top_k=None):
+        # Sparse matrix products on the biadjacency matrix instead of per node neighbour sets
+        return graph.overlap_projections(threshold, top_k)
+
+    @staticmethod
+    def select_methods(methods=None):
         # If no methods specified, use all
         if not methods:
-            methods = list(all_bipartite_algs.keys())
+            return list(BipartiteCommunities.ALGORITHMS.keys())
 
+        selected = []
         for name in methods:
-            if name in all_bipartite_algs:
-                alg, params = all_bipartite_algs[name]
-                try:
-                    communities = alg(G, **params)
-                    results[name] = {
-                        "communities": communities,
-                    }
-                except Exception as e:
-                    results[name] = {"error": str(e)}
+            if name in BipartiteCommunities.ALGORITHMS:
+                selected.append(name)
             elif name.startswith("bipartite_"):
                 print(f"Warning: Unknown bipartite method '{name}'. Skipping.")
+        return selected
 
-        return results
+    @staticmethod
+    def run_method(name, G):
+        alg, params = BipartiteCommunities.ALGORITHMS[name]
+        return algorithm(alg)(method_input(G, name in BipartiteCommunities.MUTATES_INPUT), **params)
 
+    @staticmethod
+    def add_error(results, name, error):
+        results[name] = {"error": error}
 
-#  ==== HELPER METHODS
-def get_nodes_by_bipartite_attr(G, value):
-    return [node for node, attr in G.nodes(data=True) if attr.get('bipartite') == value]
+    @staticmethod
+    def add_timeout(results, name, timeout):
+        print(f"Timed out in " + name)
+        results[name] = {"timeout": timeout}
 
+    @staticmethod
+    def detect_bipartite_communities(G, methods=None, timeout=None):
+        results = {}
 
-def create_bipartite_graph_from_file(filename):
-    G = nx.Graph()
-    G.graph['is_directed'] = False
+        for name in BipartiteCommunities.select_methods(methods):
+            if timeout:
+                entry = run_method_isolated('bipartite', name, G, timeout)
+                record_method_entry(results, 'bipartite', name, entry, G)
+                continue
+            try:
+                with profiling.measure() as figures:
+                    communities = BipartiteCommunities.run_method(name, G)
+                results[name] = {
+                    "communities": communities,
+                }
+                if profiling.enabled:
+                    results[name]["profile"] = figures
+            except Exception as e:
+                BipartiteCommunities.add_error(results, name, str(e))
+
+        return results
+
+
+#  ==== METHOD EXECUTION
+# A method run is reported as one plain entry that can cross process boundaries:
+# {"communities": [[...], ...]}, {"error": "..."} or {"timeout": {...}},
+# with the "profile" figures of the run when profiling
+def run_method_entry(kind, name, G_part, initial=None, with_hierarchy=False):
     try:
-        with open(filename, 'r') as f:
-            # Read methods from the first line
-            methods = f.readline().strip().split()
+        levels = None
+        with profiling.measure() as figures:
+            if kind == 'bipartite':
+                clustering = BipartiteCommunities.run_method(name, G_part)
+            else:
+                clustering = UnipartiteCommunities.run_method(name, G_part, initial, with_hierarchy)
+                if isinstance(clustering, tuple):
+                    clustering, levels = clustering
+        entry = {"communities": [list(comm) for comm in clustering.communities]}
+        if levels is not None:
+            entry["hierarchy"] = levels
+        if profiling.enabled:
+            entry["profile"] = figures
+        return entry
+    except Exception as e:
+        return {"error": str(e)}
 
-            # Read Group 1 nodes
-            group1 = set(map(int, f.readline().strip().split()))
 
-            # Read Group 2 nodes
-            group2 = set(map(int, f.readline().strip().split()))
+def method_process(conn, kind, name, G_part, initial=None, with_hierarchy=False):
+    conn.send(run_method_entry(kind, name, G_part, initial, with_hierarchy))
+    conn.close()
 
-            # Add nodes to the graph with bipartite attribute set directly
-            G.add_nodes_from(group1, bipartite=0)
-            G.add_nodes_from(group2, bipartite=1)
 
-            # Read and add edges
-            for line in f:
-                node1, node2 = map(int, line.strip().split())
-                G.add_edge(node1, node2)
+def run_method_isolated(kind, name, G_part, timeout, initial=None, with_hierarchy=False):
+    # Run the method in its own process so it can be killed once it exceeds its budget
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=method_process, args=(sender, kind, name, G_part, initial, with_hierarchy),
+                                      daemon=True)
+    start_time = time.perf_counter()
+    process.start()
+    sender.close()
 
-        # Verify that the graph is indeed bipartite
-        if not nx.is_bipartite(G):
-            raise ValueError("The resulting graph is not bipartite.")
-        if not nx.bipartite.is_bipartite_node_set(G, get_nodes_by_bipartite_attr(G, 0)):
-            raise ValueError("The resulting graph is not bipartite.")
+    if receiver.poll(timeout):
+        try:
+            entry = receiver.recv()
+        except EOFError:
+            entry = {"error": f"Method process exited with code {process.exitcode}"}
+        process.join()
+        return entry
+
+    process.terminate()
+    process.join(1)
+    if process.is_alive():
+        process.kill()
+        process.join()
+    return {"timeout": {"limit_seconds": timeout, "elapsed_seconds": time.perf_counter() - start_time}}
+
+
+def record_method_entry(results, kind, name, entry, G_part):
+    from cdlib import NodeClustering
+    if kind == 'bipartite':
+        if 'error' in entry:
+            BipartiteCommunities.add_error(results, name, entry['error'])
+        elif 'timeout' in entry:
+            BipartiteCommunities.add_timeout(results, name, entry['timeout'])
+        else:
+            results[name] = {"communities": NodeClustering(entry['communities'], G_part, name)}
+            if 'profile' in entry:
+                results[name]["profile"] = entry['profile']
+    else:
+        if 'error' in entry:
+            UnipartiteCommunities.add_error(results, name, kind, entry['error'])
+        elif 'timeout' in entry:
+            UnipartiteCommunities.add_timeout(results, name, kind, entry['timeout'])
+        else:
+            results[name] = {"communities": NodeClustering(entry['communities'], G_part, name)}
+            if 'profile' in entry:
+                results[name]["profile"] = entry['profile']
+            if 'hierarchy' in entry:
+                results[name]["hierarchy"] = entry['hierarchy']
+
+
+#  ==== PRELOADING
+# Small bipartite graph in the INPUT.txt layout, every method runs on it in a few milliseconds
+WARM_UP_GRAPH = "\n0 1 2 3 4 5\n6 7 8 9\n0 6\n0 8\n1 6\n1 7\n2 7\n2 8\n3 8\n3 9\n4 6\n4 9\n5 7\n5 9"
+
+
+def preload_methods(methods=None, warm=False, render=False):
+    # Imports cdlib (and matplotlib for render) up front, so processes forked afterwards start
+    # with them loaded; warm also runs every selected method (all when none are given) once,
+    # which loads the backends a method only imports on its first call
+    start_time = time.perf_counter()
+    algorithm('louvain')
+    if render:
+        import matplotlib.pyplot
+    if warm:
+        graph, _ = CSRBipartiteGraph.from_text(WARM_UP_GRAPH)
+        G = graph.to_networkx()
+        G_projected_0, _ = BipartiteCommunities.project_graphs_weighted(graph)
+        bipartite = [m for m in methods or [] if m.startswith('bipartite_')]
+        unipartite = [m for m in methods or [] if m.startswith('unipartite_')]
+        # select_methods reads an empty list as all methods, which only applies when none are given
+        if bipartite or not methods:
+            for name in BipartiteCommunities.select_methods(bipartite):
+                run_method_entry('bipartite', name, G)
+        if unipartite or not methods:
+            for name in UnipartiteCommunities.select_methods(unipartite):
+                run_method_entry(0, name, G_projected_0)
+    print(f"Preloaded in {time.perf_counter() - start_time:.2f} seconds")
+
+
+#  ==== PARALLEL EXECUTION
+# Graphs of the current request, handed to every pool worker once instead of per task
+worker_graphs = {}
+
+
+def init_method_worker(graphs):
+    worker_graphs.update(graphs)
+
+
+def run_method_task(kind, name, timeout=None, initial=None, with_hierarchy=False):
+    if timeout:
+        return run_method_isolated(kind, name, worker_graphs[kind], timeout, initial, with_hierarchy)
+    return run_method_entry(kind, name, worker_graphs[kind], initial, with_hierarchy)
+
+
+def detect_communities_parallel(G, G_projected_0, G_projected_1, bipartite_methods, unipartite_methods, workers,
+                                timeout=None, warm_start=None, with_hierarchy=False):
+    graphs = {'bipartite': G, 0: G_projected_0, 1: G_projected_1}
+    warm_start = {'bipartite': {}, 0: (warm_start or ({}, {}))[0], 1: (warm_start or ({}, {}))[1]}
+
+    tasks = [('bipartite', name) for name in bipartite_methods]
+    tasks += [(set_number, name) for set_number in (0, 1) for name in unipartite_methods]
+
+    results = {'bipartite': {}, 0: {}, 1: {}}
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_method_worker, initargs=(graphs,)) as executor:
+        futures = [executor.submit(run_method_task, kind, name, timeout, warm_start[kind].get(name), with_hierarchy)
+                   for kind, name in tasks]
+
+        # Collect in submission order so the results keep the sequential method order
+        for (kind, name), future in zip(tasks, futures):
+            try:
+                entry = future.result()
+            except Exception as e:
+                entry = {"error": str(e)}
+            record_method_entry(results[kind], kind, name, entry, graphs[kind])
+
+    return results['bipartite'], results[0], results[1]
 
-        return G, methods
+
+#  ==== HELPER METHODS
+def create_bipartite_graph_from_file(filename):
+    try:
+        return CSRBipartiteGraph.from_file(filename)
 
     except FileNotFoundError:
         print(f"Error: File '{filename}' not found.")
@@ -140,7 +375,6 @@ def create_bipartite_graph_from_file(filename):
     return None, None  # Return None for both G and methods if any error occurred
 
 
-
 def json_serialize(obj):
     if isinstance(obj, np.integer):
         return int(obj)
@@ -157,72 +391,73 @@ def calculate_metrics(G, communities):
        # 'modularity': evaluation.newman_girvan_modularity(G, communities).score,
         #'surprise': evaluation.surprise(G, communities).score,
      #   'significance': evaluation.significance(G, communities).score,
-        'average_internal_degree': evaluation.average_internal_degree(G,communities).score,
-        'internal_edge_density': evaluation.internal_edge_density(G,communities).score,
-        'scaled_density': evaluation.scaled_density(G,communities).score,
-        'hub_dominance':evaluation.hub_dominance(G,communities).score,
-        'conductance': evaluation.conductance(G,communities).score,
-        'amount': communities.__sizeof__()
     }
+    # average_internal_degree, internal_edge_density, scaled_density, hub_dominance,
+    # conductance and the number of communities, all in one pass
+    metrics.update(community_metrics(G, communities.communities))
     return metrics
 
 
-def split_bipartite_communities(G, communities):
-    set0_communities = []
-    set1_communities = []
-    for community in communities:
-        set0_comm = [node for node in community if G.nodes[node]['bipartite'] == 0]
-        set1_comm = [node for node in community if G.nodes[node]['bipartite'] == 1]
-
-        if set0_comm and set1_comm:
-            sys.exit(1)
-        elif set0_comm:
-            set0_communities.append(set0_comm)
-        elif set1_comm:
-            set1_communities.append(set1_comm)
-
+def community_side_counts(graph, communities):
+    # Members of every community per side, looked up in the side label array of the graph.
+    # Rows: group 0, group 1 and nodes that are not in the graph.
+    sizes = [len(comm) for comm in communities]
+    members = np.fromiter((node for comm in communities for node in comm), dtype=np.int64, count=sum(sizes))
+    labels = np.repeat(np.arange(len(communities)), sizes)
+    sides = np.full(len(members), 2, dtype=np.int64)
+    if graph.number_of_nodes():
+        position = np.minimum(np.searchsorted(graph.nodes, members), graph.number_of_nodes() - 1)
+        found = graph.nodes[position] == members
+        sides[found] = graph.side[position[found]]
+    counts = np.zeros((3, len(communities)), dtype=np.int64)
+    np.add.at(counts, (sides, labels), 1)
+    return counts
+
+
+def split_bipartite_communities(communities, counts):
+    # Communities of a valid clustering lie on one side, counts from community_side_counts
+    set0_communities = [list(comm) for comm, in_set0 in zip(communities, counts[0] > 0) if in_set0]
+    set1_communities = [list(comm) for comm, in_set1 in zip(communities, counts[1] > 0) if in_set1]
     return set0_communities, set1_communities
 
 
-def validate_bipartite_clustering(G, communities):
-    if not nx.is_bipartite(G):
-        return False
-
-    for community in communities:
-        bipartite_values = set(G.nodes[node]['bipartite'] for node in community)
-        if len(bipartite_values) > 1:
-            return False
-    return True
+def validate_bipartite_clustering(counts):
+    # The graph is bipartite by construction (CSRBipartiteGraph checks every edge against the groups),
+    # so only mixed communities and unknown nodes are left to check
+    return not counts[2].any() and not ((counts[0] > 0) & (counts[1] > 0)).any()
 
 
-def validate_unipartite_clustering(G, communities):
-    for community in communities:
-        unipartite_values = set(G.nodes[node]['bipartite'] for node in community)
-        if len(unipartite_values) > 1:
-            print(community)
-            return False
-    return True
+def validate_unipartite_clustering(counts, set_number):
+    # Every member has to be a node of the projected side
+    return not counts[2].any() and not counts[1 - set_number].any()
 
 
-def handle_bipartite(G, set0_results, set1_results, bipartite_results):
+def handle_bipartite(graph, G, set0_results, set1_results, bipartite_results):
     for method in bipartite_results:
-        if 'communities' in bipartite_results[method]:
+        if 'timeout' in bipartite_results[method] or 'error' in bipartite_results[method]:
+            set0_results[method] = dict(bipartite_results[method])
+            set1_results[method] = dict(bipartite_results[method])
+        elif 'communities' in bipartite_results[method]:
             clustering_result = bipartite_results[method]['communities']
 
-            # Remove empty communities
-            clustering_result.communities = [comm for comm in clustering_result.communities if comm]
+            with profiling.measure() as figures:
+                # Remove empty communities
+                clustering_result.communities = [comm for comm in clustering_result.communities if comm]
 
-            # Validate the clustering
-            if not validate_bipartite_clustering(G, clustering_result.communities):
-                error_message = f"Error: Invalid bipartite clustering for method {method}. Mixed nodes from different partitions."
-                print(error_message)
-                continue
+                # Validate the clustering
+                counts = community_side_counts(graph, clustering_result.communities)
+                if not validate_bipartite_clustering(counts):
+                    error_message = f"Error: Invalid bipartite clustering for method {method}. Mixed nodes from different partitions."
+                    print(error_message)
+                    set0_results[f"{method}"] = {"error": error_message}
+                    set1_results[f"{method}"] = {"error": error_message}
+                    continue
 
-            # Split communities based on the partition
-            set0_communities, set1_communities = split_bipartite_communities(G, clustering_result.communities)
+                # Split communities based on the partition
+                set0_communities, set1_communities = split_bipartite_communities(clustering_result.communities, counts)
 
-            # Calculate metrics using the original community object
-            metrics = calculate_metrics(G, clustering_result)
+                # Calculate metrics using the original community object
+                metrics = calculate_metrics(G, clustering_result)
 
             # Add to consolidated results
             set0_results[f"{method}"] = {
@@ -233,54 +468,107 @@ def handle_bipartite(G, set0_results, set1_results, bipartite_results):
                 "communities": set1_communities,
                 "metrics": metrics
             }
+            if 'profile' in bipartite_results[method]:
+                method_profile = {"run": bipartite_results[method]['profile'], "postprocess": figures}
+                set0_results[f"{method}"]["profile"] = method_profile
+                set1_results[f"{method}"]["profile"] = method_profile
 
 
-def handle_unipartite(G_projected, set_results, unipartite_results):
+def handle_unipartite(graph, set_number, G_projected, set_results, unipartite_results):
     for method, result in unipartite_results.items():
-        if 'communities' in result:
+        if 'timeout' in result or 'error' in result:
+            set_results[method] = dict(result)
+        elif 'communities' in result:
             clustering_result = result['communities']
 
-            if not validate_unipartite_clustering(G_projected, clustering_result.communities):
-                error_message = f"Error: Invalid clustering for method {method}. Mixed nodes from different partitions."
-                print(error_message)
-                continue
+            with profiling.measure() as figures:
+                counts = community_side_counts(graph, clustering_result.communities)
+                if not validate_unipartite_clustering(counts, set_number):
+                    error_message = f"Error: Invalid clustering for method {method}. Mixed nodes from different partitions."
+                    print(error_message)
+                    set_results[f"{method}"] = {"error": error_message}
+                    continue
 
-            # Remove empty communities
-            clustering_result.communities = [comm for comm in clustering_result.communities if comm]
+                # Remove empty communities
+                clustering_result.communities = [comm for comm in clustering_result.communities if comm]
 
-            metrics = calculate_metrics(G_projected, clustering_result)
+                metrics = calculate_metrics(G_projected, clustering_result)
             set_results[f"{method}"] = {
                 "communities": [list(comm) for comm in clustering_result.communities],
                 "metrics": metrics
             }
+            if 'hierarchy' in result:
+                set_results[f"{method}"]["hierarchy"] = result['hierarchy']
+            if 'profile' in result:
+                set_results[f"{method}"]["profile"] = {"run": result['profile'], "postprocess": figures}
 
 
-def save_results(G, results, filename):
+def serialize_results(results):
     serializable_results = {}
     for method, data in results.items():
+        if 'communities' not in data:
+            # Timeouts, errors and methods the latency budget replaced or skipped
+            serializable_results[method] = dict(data)
+            continue
         serializable_results[method] = {
             "communities": [[int(node) for node in comm] for comm in data["communities"]],
             "metrics": {k: float(v) if isinstance(v, np.number) else v for k, v in data["metrics"].items()}
         }
+        for key in ('hierarchy', 'profile'):
+            if key in data:
+                serializable_results[method][key] = data[key]
+    return serializable_results
+
+
+def results_filenames(base_filename, output_format='json'):
+    extension = result_format.RESULT_EXTENSIONS[output_format]
+    return f"{base_filename}_set0_results{extension}", f"{base_filename}_set1_results{extension}"
 
-    with open(filename, 'w') as f:
-        json.dump(serializable_results, f, indent=2, default=json_serialize)
+
+def save_results(G, results, filename, output_format='json', profile=None):
+    # profile: stage figures of the run, saved under the "profile" key
+    if output_format == 'compact':
+        result_format.write_results_compact(results, filename, default=json_serialize, profile=profile)
+    elif output_format == 'binary':
+        result_format.write_results_binary(results, filename, profile=profile)
+    else:
+        serializable_results = serialize_results(results)
+        if profile is not None:
+            serializable_results["profile"] = profile
+        with open(filename, 'w') as f:
+            json.dump(serializable_results, f, indent=2, default=json_serialize)
     print(f"Results saved to: {filename}")
 
+# Above this many nodes the O(n^2) spring layout costs more than the clustering itself
+SPRING_LAYOUT_MAX_NODES = 500
+# Edges drawn for large graphs, the rest only adds ink and rasterization time
+MAX_DRAWN_EDGES = 2000
+
+
 def print_graph(G, filename):
+    import matplotlib.pyplot as plt
+    large = G.number_of_nodes() > SPRING_LAYOUT_MAX_NODES
     plt.figure(figsize=(12, 8))
-    pos = nx.spring_layout(G)
+    if large:
+        # Two columns, constraints on the left and domains on the right, in linear time
+        pos = nx.bipartite_layout(G, [n for n, d in G.nodes(data=True) if d.get('bipartite') == 0])
+    else:
+        pos = nx.spring_layout(G)
     
     # Draw nodes
     nx.draw_networkx_nodes(G, pos,
                            node_color=['lightblue' if G.nodes[n].get('bipartite') == 0 else 'lightgreen' for n in G.nodes()],
-                           node_size=500)
+                           node_size=20 if large else 500)
     
     # Draw edges
-    nx.draw_networkx_edges(G, pos, alpha=0.5)
+    edges = list(G.edges())
+    if len(edges) > MAX_DRAWN_EDGES:
+        edges = random.Random(0).sample(edges, MAX_DRAWN_EDGES)
+    nx.draw_networkx_edges(G, pos, edgelist=edges, alpha=0.1 if large else 0.5)
     
     # Draw labels
-    nx.draw_networkx_labels(G, pos)
+    if not large:
+        nx.draw_networkx_labels(G, pos)
     
     # Create legend
     lightblue_patch = plt.Line2D([0], [0], marker='o', color='w', label='Set 0 (Constraints)',
@@ -292,10 +580,34 @@ def print_graph(G, filename):
     plt.title("Graph Visualization")
     plt.axis('off')
     plt.tight_layout()
-    plt.savefig(f"{filename}", dpi=300, bbox_inches='tight')
+    plt.savefig(f"{filename}", dpi=100 if large else 300, bbox_inches='tight')
     plt.close()
 
-def save_graph_data(G):
+
+def render_graph(graph, filename):
+    try:
+        print_graph(graph.to_networkx(), filename)
+    except Exception as e:
+        print(f"Error: rendering {filename} failed: {str(e)}")
+
+
+# Single background process for the PNGs, created on the first render
+render_executor = None
+
+
+def render_graph_async(graph, filename):
+    # Rendering runs off the response path; the executor finishes pending PNGs at exit
+    global render_executor
+    if render_executor is None:
+        render_executor = ProcessPoolExecutor(max_workers=1)
+    return render_executor.submit(render_graph, graph, filename)
+
+
+def graph_data_serialize(obj):
+    return str(obj) if isinstance(obj, (set, np.integer, np.floating)) else obj
+
+
+def compute_graph_data(G):
     metrics = {
         "graph_level": {},
         "set0": {},
@@ -367,66 +679,492 @@ def save_graph_data(G):
     metrics["graph_level"]["avg_pagerank_set0"] = sum(pagerank[n] for n in nodes_0) / len(nodes_0)
     metrics["graph_level"]["avg_pagerank_set1"] = sum(pagerank[n] for n in nodes_1) / len(nodes_1)
 
+    return metrics
+
+
+def save_graph_data(metrics):
     # Save metrics to a JSON file
     with open("graph_metrics.json", 'w') as f:
-        json.dump(metrics, f, indent=2,
-                  default=lambda x: str(x) if isinstance(x, (set, np.integer, np.floating)) else x)
+        json.dump(metrics, f, indent=2, default=graph_data_serialize)
     print("Graph metrics saved to: graph_metrics.json")
 
-def get_graph_data(filename):
+def get_graph_data(filename, fast=False):
         # Create bipartite graph and get the method
-    G, method = create_bipartite_graph_from_file(filename)
-    if G is None:
+    graph, method = create_bipartite_graph_from_file(filename)
+    if graph is None:
         return
 
-    save_graph_data(G)
+    if fast:
+        save_graph_data(compute_graph_data_fast(graph))
+    else:
+        save_graph_data(compute_graph_data(graph.to_networkx()))
+
+def cache_lookup(cache, graph_key, methods, algorithms_table, set0_results, set1_results):
+    # Move every method with a cached result into the set results, return the rest
+    remaining = []
+    for name in methods:
+        entry = cache.get(result_cache.method_key(graph_key, name, algorithms_table[name][1]))
+        if entry is None:
+            remaining.append(name)
+        else:
+            set0_results[name] = entry["set0"]
+            set1_results[name] = entry["set1"]
+    return remaining
+
+
+def cache_store(cache, graph_key, methods, algorithms_table, set0_results, set1_results):
+    # Only complete results are cached, errors and timeouts are retried next time
+    for name in methods:
+        entries = (set0_results.get(name), set1_results.get(name))
+        if all(entry is not None and 'communities' in entry for entry in entries):
+            # Profile figures belong to this run, not to the cached result
+            cache.put(result_cache.method_key(graph_key, name, algorithms_table[name][1]), {
+                "set0": {k: v for k, v in serialize_results({name: entries[0]})[name].items() if k != 'profile'},
+                "set1": {k: v for k, v in serialize_results({name: entries[1]})[name].items() if k != 'profile'}
+            })
+
+
+def order_results(results, methods):
+    position = {name: i for i, name in enumerate(methods)}
+    return dict(sorted(results.items(), key=lambda item: position.get(item[0].split(';')[0], len(position))))
+
+
+def select_within_budget(graph, G_projected_0, G_projected_1, bipartite_methods, unipartite_methods, budget,
+                         workers=None):
+    # Bipartite methods run once on the graph, unipartite ones once on every projection
+    bipartite_size = [(graph.number_of_nodes(), graph.number_of_edges())]
+    projection_sizes = [(H.number_of_nodes(), H.number_of_edges()) for H in (G_projected_0, G_projected_1)]
+    method_sizes = {name: bipartite_size for name in BipartiteCommunities.ALGORITHMS}
+    method_sizes.update({name: projection_sizes for name in UnipartiteCommunities.ALGORITHMS})
+
+    selected, selection = method_selection.select_methods(bipartite_methods + unipartite_methods, method_sizes,
+                                                          budget, workers)
+    return ([name for name in selected if name.startswith('bipartite_')],
+            [name for name in selected if name.startswith('unipartite_')], selection)
+
+
+def cluster_graph(graph, methods, method_workers=None, method_timeout=None, cache=None, projection_threshold=None,
+                  projection_top_k=None, projections=None, warm_start=None, profile=None, latency_budget=None,
+                  with_hierarchy=False):
+    # projections: already built (set 0, set 1) projections of the graph
+    # warm_start: previous (set 0, set 1) communities per method, see UnipartiteCommunities.WARM_START
+    # profile: dict collecting the stage figures, see profiling.new_profile
+    # latency_budget: seconds the methods should finish in, see method_selection
+    # with_hierarchy: add every level of the hierarchical methods to their results, see hierarchy.py
+    bipartite_methods = BipartiteCommunities.select_methods([m for m in methods if m.startswith('bipartite_')])
+    unipartite_methods = UnipartiteCommunities.select_methods([m for m in methods if m.startswith('unipartite_')])
+    all_methods = bipartite_methods + unipartite_methods
 
-def do_clustering(filename):
-    # Create bipartite graph and get the methods
-    G, methods = create_bipartite_graph_from_file(filename)
-    if G is None:
-        return
-        
-    print_graph(G, f"{filename}_visualization.png")
+    # = OUTPUT
+    set0_results = {}
+    set1_results = {}
+
+    if cache is not None:
+        graph_key = result_cache.graph_hash(graph.group0.tolist(), graph.group1.tolist(), graph.edges.tolist())
+        if projection_threshold is not None or projection_top_k is not None:
+            # Pruned projections give different unipartite results
+            graph_key = result_cache.method_key(graph_key, 'projection',
+                                                {'threshold': projection_threshold, 'top_k': projection_top_k})
+        if with_hierarchy:
+            # Results without the levels do not answer a hierarchy request
+            graph_key = result_cache.method_key(graph_key, 'hierarchy', {})
+        with profiling.stage(profile, 'cache_lookup'):
+            bipartite_methods = cache_lookup(cache, graph_key, bipartite_methods, BipartiteCommunities.ALGORITHMS,
+                                             set0_results, set1_results)
+            unipartite_methods = cache_lookup(cache, graph_key, unipartite_methods, UnipartiteCommunities.ALGORITHMS,
+                                              set0_results, set1_results)
+        if not bipartite_methods and not unipartite_methods:
+            print("All methods served from the result cache")
+            return set0_results, set1_results
 
     # Create projection
-    G_projected_0, G_projected_1 = BipartiteCommunities.project_graphs_weighted(G)
+    with profiling.stage(profile, 'projection'):
+        if projections is None:
+            projections = BipartiteCommunities.project_graphs_weighted(graph, projection_threshold, projection_top_k)
+    G_projected_0, G_projected_1 = projections
+    warm_start = warm_start or ({}, {})
+    if profile is not None:
+        profile["sizes"] = {name: [H.number_of_nodes(), H.number_of_edges()]
+                            for name, H in (("bipartite", graph), ("set0", G_projected_0), ("set1", G_projected_1))}
+
+    if latency_budget is not None:
+        bipartite_methods, unipartite_methods, selection = select_within_budget(
+            graph, G_projected_0, G_projected_1, bipartite_methods, unipartite_methods, latency_budget, method_workers)
+        # Substitutes come after the requested methods in the results
+        all_methods = all_methods + [name for name in bipartite_methods + unipartite_methods if name not in all_methods]
+        set0_results.update(selection)
+        set1_results.update(selection)
 
     start_time = time.time()
     print("start")
-    # Apply the methods on the bipartite graph
-    bipartite_methods = [m for m in methods if m.startswith('bipartite_')]
-    bipartite_results = BipartiteCommunities.detect_bipartite_communities(G.copy(), bipartite_methods)
-
-    # Apply the methods on the projected graphs
-    unipartite_methods = [m for m in methods if m.startswith('unipartite_')]
-    unipartite_results_0 = UnipartiteCommunities.detect_unipartite_communities(G_projected_0.copy(), 0, unipartite_methods)
-    unipartite_results_1 = UnipartiteCommunities.detect_unipartite_communities(G_projected_1.copy(), 1, unipartite_methods)
+    bipartite_results, unipartite_results_0, unipartite_results_1 = {}, {}, {}
+
+    with profiling.stage(profile, 'methods'):
+        # The networkx view is the input of the bipartite methods alone, the rest works on the CSR graph
+        G = graph.to_networkx() if bipartite_methods else None
+        if method_workers and method_workers > 1:
+            # Every (method, projection) pair is independent, run them side by side
+            bipartite_results, unipartite_results_0, unipartite_results_1 = detect_communities_parallel(
+                G, G_projected_0, G_projected_1, bipartite_methods, unipartite_methods,
+                method_workers, method_timeout, warm_start, with_hierarchy)
+        else:
+            # Apply the methods on the bipartite graph
+            if bipartite_methods:
+                bipartite_results = BipartiteCommunities.detect_bipartite_communities(G, bipartite_methods, method_timeout)
+
+            # Apply the methods on the projected graphs
+            if unipartite_methods:
+                unipartite_results_0 = UnipartiteCommunities.detect_unipartite_communities(G_projected_0, 0, unipartite_methods, method_timeout, warm_start[0], with_hierarchy)
+                unipartite_results_1 = UnipartiteCommunities.detect_unipartite_communities(G_projected_1, 1, unipartite_methods, method_timeout, warm_start[1], with_hierarchy)
     end_time = time.time()
 
     # Calculate and print the time difference
     execution_time = end_time - start_time
     print(f"Total execution time: {execution_time:.4f} seconds")
 
-    base_filename = os.path.splitext(filename)[0]
+    # Validation, splitting and metrics of every method
+    with profiling.stage(profile, 'postprocess'):
+        # Process bipartite results
+        handle_bipartite(graph, G, set0_results, set1_results, bipartite_results)
+
+        # Process unipartite results
+        handle_unipartite(graph, 0, G_projected_0, set0_results, unipartite_results_0)
+        handle_unipartite(graph, 1, G_projected_1, set1_results, unipartite_results_1)
+
+    if cache is not None:
+        with profiling.stage(profile, 'cache_store'):
+            cache_store(cache, graph_key, bipartite_methods, BipartiteCommunities.ALGORITHMS, set0_results, set1_results)
+            cache_store(cache, graph_key, unipartite_methods, UnipartiteCommunities.ALGORITHMS, set0_results, set1_results)
+
+    if cache is not None or latency_budget is not None:
+        set0_results = order_results(set0_results, all_methods)
+        set1_results = order_results(set1_results, all_methods)
+
+    return set0_results, set1_results
+
+
+def profile_record(source, graph, profile, set0_results, set1_results):
+    # One metrics log entry: stage figures, per-method figures and the memory high-water marks
+    methods = {}
+    for set_name, results in (("set0", set0_results), ("set1", set1_results)):
+        for name, entry in results.items():
+            if 'profile' in entry:
+                # Bipartite methods run once for both sets
+                methods[name if name in BipartiteCommunities.ALGORITHMS else f"{name};{set_name}"] = entry['profile']
+    return {
+        "graph": source,
+        "num_nodes": graph.number_of_nodes(),
+        "num_edges": graph.number_of_edges(),
+        "stages": profile["stages"],
+        "methods": methods,
+        "peak_rss_bytes": profiling.peak_rss(),
+        "peak_child_rss_bytes": profiling.peak_rss(children=True)
+    }
 
-    # = OUTPUT
-    set0_results = {}
-    set1_results = {}
 
-    # Process bipartite results
-    handle_bipartite(G, set0_results, set1_results, bipartite_results)
+def do_clustering(filename, cache=None, render=False, output_format=None, **options):
+    # Without an output format, binary graph files get binary results and INPUT.txt json ones
+    if output_format is None:
+        output_format = 'binary' if os.path.exists(filename) and CSRBipartiteGraph.is_binary_file(filename) else 'json'
+    profile = profiling.new_profile()
+
+    # Create bipartite graph and get the methods
+    with profiling.stage(profile, 'load'):
+        graph, methods = create_bipartite_graph_from_file(filename)
+    if graph is None:
+        return
+        
+    if render:
+        render_graph_async(graph, f"{filename}_visualization.png")
+
+    set0_results, set1_results = cluster_graph(graph, methods, cache=cache, profile=profile, **options)
 
-    # Process unipartite results
-    handle_unipartite(G_projected_0, set0_results, unipartite_results_0)
-    handle_unipartite(G_projected_1, set1_results, unipartite_results_1)
+    set0_filename, set1_filename = results_filenames(os.path.splitext(filename)[0], output_format)
 
     # Save consolidated results
-    save_results(G_projected_0, set0_results, f"{base_filename}_set0_results.json")
-    save_results(G_projected_1, set1_results, f"{base_filename}_set1_results.json")
+    with profiling.stage(profile, 'save'):
+        save_results(graph, set0_results, set0_filename, output_format, profile)
+        save_results(graph, set1_results, set1_filename, output_format, profile)
+
+    if profile is not None:
+        profiling.log_run(profile_record(filename, graph, profile, set0_results, set1_results))
+
+
+#  ==== REQUEST SERVER
+def graph_from_request(graph):
+    # Either the INPUT.txt text verbatim or {"methods", "group0", "group1", "edges"}
+    if isinstance(graph, str):
+        return CSRBipartiteGraph.from_text(graph)
+    if isinstance(graph, dict):
+        return (CSRBipartiteGraph(graph.get('group0', []), graph.get('group1', []), graph.get('edges', [])),
+                list(graph.get('methods', [])))
+    raise ValueError("Error: request has no graph")
+
+
+# Graphs kept per worker for incremental requests, oldest dropped first
+MAX_GRAPH_SESSIONS = 16
+graph_sessions = {}
+
+
+def warm_start_partitions(set_results):
+    return {name: entry['communities'] for name, entry in set_results.items()
+            if name in UnipartiteCommunities.WARM_START and 'communities' in entry}
+
+
+def session_graph(request, projection_threshold=None, projection_top_k=None):
+    # A request with "graph_id" and "graph" (re)registers the graph, one with "graph_id" and
+    # "delta" (see CSRBipartiteGraph.apply_delta) updates the graph registered under that id
+    graph_id = request['graph_id']
+    # Left in place until the update succeeds, a delta that fails validation keeps the graph it was sent against
+    session = graph_sessions.get(graph_id)
+    pruning = (projection_threshold, projection_top_k)
+
+    if request.get('delta') is None:
+        graph, methods = graph_from_request(request.get('graph'))
+        session = {"methods": methods, "warm_start": ({}, {})}
+        projections = BipartiteCommunities.project_graphs_weighted(graph, *pruning)
+    elif session is None:
+        raise ValueError(f"Error: unknown graph_id '{graph_id}', send the full graph first")
+    else:
+        graph, changed, removed = session['graph'].apply_delta(request['delta'])
+        if projection_top_k is None and session['pruning'] == pruning:
+            projections = graph.update_projections(session['projections'], changed, removed, projection_threshold)
+        else:
+            # Top-k pruning ranks the edges of every node, a delta can change anyone's neighbours
+            projections = BipartiteCommunities.project_graphs_weighted(graph, *pruning)
+
+    session.update(graph=graph, projections=projections, pruning=pruning)
+    # Last used, last dropped
+    graph_sessions.pop(graph_id, None)
+    graph_sessions[graph_id] = session
+    while len(graph_sessions) > MAX_GRAPH_SESSIONS:
+        graph_sessions.pop(next(iter(graph_sessions)))
+    return session
+
+
+def handle_request(request, cache_path=None, cache_size=256 * 1024 * 1024, **options):
+    # Clustering options given in the request override the server defaults
+    options = {name: request.get(name, value) for name, value in options.items()}
+    cache = result_cache.open_cache(cache_path, cache_size) if cache_path else None
+    command = request.get('command')
+    if command == 'dummy':
+        return {}
+    if command == 'stats':
+        return cache.stats() if cache is not None else {}
+
+    session = None
+    if request.get('graph_id') is not None:
+        session = session_graph(request, options.get('projection_threshold'), options.get('projection_top_k'))
+        graph, methods = session['graph'], session['methods']
+    else:
+        graph, methods = graph_from_request(request.get('graph'))
+
+    if command == 'cluster':
+        # "render": "<path>.png" asks for a picture of the graph, drawn in the background
+        if request.get('render'):
+            render_graph_async(graph, request['render'])
+        profile = profiling.new_profile()
+        if session is None:
+            set0_results, set1_results = cluster_graph(graph, request.get('methods') or methods, cache=cache,
+                                                       profile=profile, **options)
+        else:
+            # Incremental request: reuse the updated projections and start from the previous partitions
+            set0_results, set1_results = cluster_graph(graph, request.get('methods') or methods, cache=cache,
+                                                       projections=session['projections'],
+                                                       warm_start=session['warm_start'], profile=profile, **options)
+            session['warm_start'] = (warm_start_partitions(set0_results), warm_start_partitions(set1_results))
+        response = {
+            "set0": serialize_results(set0_results),
+            "set1": serialize_results(set1_results)
+        }
+        if profile is not None:
+            response["profile"] = profile
+            profiling.log_run(profile_record(request.get('graph_id', 'request'), graph, profile,
+                                             set0_results, set1_results))
+        return response
+    elif command == 'info':
+        if request.get('fast'):
+            metrics = compute_graph_data_fast(graph, request.get('pivots', DEFAULT_PIVOTS))
+        else:
+            metrics = compute_graph_data(graph.to_networkx())
+        # Round-trip through json so the response matches graph_metrics.json
+        return json.loads(json.dumps(metrics, default=graph_data_serialize))
+    raise ValueError('Error: wrong name')
+
+
+#  ==== BATCH
+SUMMARY_FIELDS = ['graph', 'status', 'num_nodes', 'num_edges', 'methods', 'seconds', 'error']
+
+
+def list_batch_inputs(path, pattern='*.txt'):
+    # A directory of INPUT files, or a manifest with one graph path per line
+    if os.path.isdir(path):
+        return sorted(glob.glob(os.path.join(path, pattern)))
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, 'r') as f:
+        return [os.path.join(base, line.strip()) for line in f if line.strip() and not line.startswith('#')]
+
+
+def batch_output_paths(filename, out_dir, output_format='json'):
+    base_filename = os.path.join(out_dir, os.path.splitext(os.path.basename(filename))[0])
+    return results_filenames(base_filename, output_format)
+
+
+def cluster_batch_file(filename, out_dir, cache_path=None, cache_size=256 * 1024 * 1024, render=False,
+                       output_format='json', **options):
+    row = {'graph': filename, 'status': 'ok', 'num_nodes': '', 'num_edges': '', 'methods': '', 'seconds': '',
+           'error': ''}
+    start_time = time.perf_counter()
+    profile = profiling.new_profile()
+    try:
+        with profiling.stage(profile, 'load'):
+            graph, methods = CSRBipartiteGraph.from_file(filename)
+        row.update(num_nodes=graph.number_of_nodes(), num_edges=graph.number_of_edges(), methods=' '.join(methods))
+        if render:
+            render_graph_async(graph, os.path.join(out_dir, f"{os.path.basename(filename)}_visualization.png"))
+
+        cache = result_cache.open_cache(cache_path, cache_size) if cache_path else None
+        set0_results, set1_results = cluster_graph(graph, methods, cache=cache, profile=profile, **options)
+
+        # Write to temporary names first so an interrupted run never leaves a half written result behind
+        with profiling.stage(profile, 'save'):
+            for results, path in zip((set0_results, set1_results), batch_output_paths(filename, out_dir, output_format)):
+                save_results(graph, results, path + '.tmp', output_format, profile)
+                os.replace(path + '.tmp', path)
+        if profile is not None:
+            profiling.log_run(profile_record(filename, graph, profile, set0_results, set1_results))
+    except Exception as e:
+        row.update(status='error', error=str(e))
+    row['seconds'] = f"{time.perf_counter() - start_time:.4f}"
+    return row
+
+
+def write_batch_summary(summary_path, rows):
+    with open(summary_path + '.tmp', 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(summary_path + '.tmp', summary_path)
+
+
+def run_batch(path, out_dir=None, workers=None, **options):
+    filenames = list_batch_inputs(path)
+    out_dir = out_dir or (path if os.path.isdir(path) else os.path.dirname(os.path.abspath(path)))
+    os.makedirs(out_dir, exist_ok=True)
+
+    # Resume: graphs with both result files are done, earlier timings are kept in the summary
+    summary_path = os.path.join(out_dir, 'batch_summary.csv')
+    summary = {}
+    if os.path.exists(summary_path):
+        with open(summary_path, 'r', newline='') as f:
+            summary = {row['graph']: row for row in csv.DictReader(f)}
+    pending = [filename for filename in filenames
+               if not all(os.path.exists(out)
+                          for out in batch_output_paths(filename, out_dir, options.get('output_format', 'json')))]
+    print(f"Batch: {len(filenames)} graphs, {len(filenames) - len(pending)} already done, {len(pending)} to run")
+
+    # The workers fork from here and start with cdlib loaded
+    if pending:
+        preload_methods(render=options.get('render', False))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(cluster_batch_file, filename, out_dir, **options) for filename in pending]
+        for done, future in enumerate(as_completed(futures), 1):
+            row = future.result()
+            summary[row['graph']] = row
+            print(f"[{done}/{len(pending)}] {row['graph']}: {row['status']} in {row['seconds']}s")
+            # Keep the summary current so an interrupted run loses nothing
+            write_batch_summary(summary_path, sorted(summary.values(), key=lambda r: r['graph']))
+
+    write_batch_summary(summary_path, sorted(summary.values(), key=lambda r: r['graph']))
+    print(f"Batch summary saved to: {summary_path}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Clustering of the constraint/domain bipartite graph")
+    parser.add_argument('--serve', action='store_true',
+                        help="run as a persistent request server instead of reading commands from stdin")
+    parser.add_argument('--host', default='127.0.0.1', help="server TCP host")
+    parser.add_argument('--port', type=int, default=5005, help="server TCP port")
+    parser.add_argument('--socket', default=None, help="serve on this Unix domain socket instead of TCP")
+    parser.add_argument('--batch', default=None,
+                        help="cluster every INPUT file of this directory (or listed in this manifest) and exit")
+    parser.add_argument('--out', default=None,
+                        help="output directory of --batch, defaults to the directory of the inputs")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help="number of requests (server) or graphs (batch) processed at once")
+    parser.add_argument('--method-workers', type=int, default=None,
+                        help="run the clustering methods of a request in a process pool of this size")
+    parser.add_argument('--method-timeout', type=float, default=None,
+                        help="wall-clock budget in seconds for each clustering method")
+    parser.add_argument('--cache', default=None,
+                        help="path of a persistent result cache, clustering results are reused across runs")
+    parser.add_argument('--cache-size', type=int, default=256,
+                        help="size cap of the result cache in MB, least recently used results are evicted")
+    parser.add_argument('--render', action='store_true',
+                        help="draw INPUT.txt_visualization.png for every cluster command, in the background")
+    parser.add_argument('--projection-threshold', type=float, default=None,
+                        help="drop projected edges whose overlap weight is below this value")
+    parser.add_argument('--projection-top-k', type=int, default=None,
+                        help="keep only the k heaviest projected edges of every node")
+    parser.add_argument('--input', default='INPUT.txt',
+                        help="graph file of the cluster and info commands, INPUT.txt text or the binary layout "
+                             "of bipartite_graph.py (put it under /dev/shm to keep it in memory)")
+    parser.add_argument('--result-format', choices=sorted(result_format.RESULT_EXTENSIONS), default=None,
+                        help="json (indented), compact (json without whitespace) or binary "
+                             "(per node community ids, read with result_format.load_results); "
+                             "defaults to binary for a binary --input and json otherwise")
+    parser.add_argument('--profile', action='store_true',
+                        help="record per-stage and per-method time and memory figures in the results")
+    parser.add_argument('--profile-memory', action='store_true',
+                        help="add tracemalloc peaks to the --profile figures, slows Python code down noticeably")
+    parser.add_argument('--profile-log', default=None,
+                        help="also append the figures of every run to this JSON lines file (implies --profile)")
+    parser.add_argument('--latency-budget', type=float, default=None,
+                        help="seconds the clustering methods of a graph should finish in: methods estimated to take "
+                             "longer are replaced by a faster equivalent or skipped")
+    parser.add_argument('--cost-model', default=None,
+                        help="cost model fitted with method_selection.py on bench.py reports, for --latency-budget")
+    parser.add_argument('--hierarchy', action='store_true',
+                        help="also return every level of Louvain, Paris and Girvan-Newman, cut later with hierarchy.py")
+    parser.add_argument('--preload', nargs='*', default=None, metavar='METHOD',
+                        help="load and run these methods (all when none are listed) once at start-up, before any "
+                             "worker process forks; without it the method backends load on the first cluster "
+                             "command of every process")
+    return parser.parse_args()
+
 
 def main():
-    filename = 'INPUT.txt'
+    args = parse_args()
+    if args.profile or args.profile_memory or args.profile_log:
+        profiling.enable(args.profile_log, args.profile_memory)
+    if args.cost_model:
+        method_selection.load_cost_model(args.cost_model)
+    if args.preload is not None:
+        preload_methods(args.preload, warm=True, render=args.render)
+    options = {
+        "method_workers": args.method_workers,
+        "method_timeout": args.method_timeout,
+        "projection_threshold": args.projection_threshold,
+        "projection_top_k": args.projection_top_k,
+        "latency_budget": args.latency_budget,
+        "with_hierarchy": args.hierarchy
+    }
+    if args.batch:
+        run_batch(args.batch, args.out, args.workers, cache_path=args.cache,
+                  cache_size=args.cache_size * 1024 * 1024, render=args.render,
+                  output_format=args.result_format or 'json', **options)
+        return
+
+    if args.serve:
+        import server
+        handler = functools.partial(handle_request, cache_path=args.cache,
+                                    cache_size=args.cache_size * 1024 * 1024, **options)
+        server.run_server(handler, host=args.host, port=args.port,
+                          unix_path=args.socket, workers=args.workers)
+        return
+
+    cache = result_cache.open_cache(args.cache, args.cache_size * 1024 * 1024) if args.cache else None
+    filename = args.input
     while True:
         # Wait for input to wake up
         command = input("Press Enter to re-run")
@@ -439,11 +1177,13 @@ def main():
 
         try:
             if command == 'cluster':
-                do_clustering(filename)
+                do_clustering(filename, cache, args.render, args.result_format, **options)
                 print(f"Finished processing {filename}")
-            elif command == 'info':
-                get_graph_data(filename)
+            elif command in ('info', 'info --fast'):
+                get_graph_data(filename, command == 'info --fast')
                 print(f"Finished processing {filename}")
+            elif command == 'stats':
+                print(json.dumps(cache.stats() if cache is not None else {}))
             elif command == 'dummy':
             	print(f"Finished processing")
             else:
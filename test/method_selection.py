@@ -0,0 +1,181 @@
+import argparse
+import importlib.util
+import json
+import math
+import sys
+
+import numpy as np
+
+# Adaptive method selection (--latency-budget). The running time of every method
+# is modelled as
+#   seconds = a * size ** b,    size = nodes + edges of the graph it runs on
+# (the bipartite graph for bipartite methods, each projection for unipartite ones),
+# with a and b fitted on the figures of bench.py:
+#   python bench.py --replay 6 --methods ... --out report.json
+#   python method_selection.py report.json --out cost_model.json
+#   python main.py --latency-budget 10 --cost-model cost_model.json
+# A method whose estimate does not fit in what is left of the budget is replaced
+# by the first available substitute that fits, or skipped. Methods without a
+# model run as requested, unless they have substitutes: with no estimate to go
+# by (bayan, AGDL) they are taken as over any budget and replaced.
+
+# Fitted on the synthetic graphs and 6 replayed graphs of bench.py, one run each
+DEFAULT_COST_MODEL = {
+    "bipartite_BiMLPA": {"a": 7.73e-04, "b": 0.75},
+    "bipartite_CONDOR": {"a": 2.00e-05, "b": 1.06},
+    "bipartite_SPECTRAL": {"a": 1.41e-03, "b": 0.75},
+    "unipartite_DER": {"a": 8.17e-07, "b": 1.31},
+    "unipartite_Girvan-Newman": {"a": 4.47e-06, "b": 1.69},
+    "unipartite_Louvain": {"a": 1.24e-06, "b": 1.36},
+    "unipartite_MCODE": {"a": 2.86e-05, "b": 1.19},
+    "unipartite_Paris": {"a": 8.10e-06, "b": 1.16},
+    "unipartite_Threshold_Clustering": {"a": 1.83e-04, "b": 0.91},
+    # leidenalg was not installed for the fit, Louvain is an upper bound of it
+    "unipartite_Leiden": {"a": 1.24e-06, "b": 1.36},
+}
+cost_model = dict(DEFAULT_COST_MODEL)
+
+# Scalable replacements, in order of preference
+SUBSTITUTES = {
+    "unipartite_Girvan-Newman": ["unipartite_Leiden", "unipartite_Louvain"],
+    "unipartite_bayan": ["unipartite_Leiden", "unipartite_Louvain"],
+    "unipartite_AGDL": ["unipartite_Leiden", "unipartite_Louvain"],
+    "unipartite_Paris": ["unipartite_Leiden", "unipartite_Louvain"],
+    "unipartite_MCODE": ["unipartite_Leiden", "unipartite_Louvain"],
+    "bipartite_SPECTRAL": ["bipartite_CONDOR"],
+}
+
+# Optional packages a method needs besides cdlib
+REQUIRES = {
+    "unipartite_Leiden": ["leidenalg", "igraph"],
+    "unipartite_RB_POTS": ["leidenalg", "igraph"],
+    "unipartite_Surprise_Communities": ["leidenalg", "igraph"],
+    "unipartite_pycombo": ["pycombo"],
+    "unipartite_bayan": ["bayanpy"],
+}
+
+# Samples faster than this are mostly fixed overhead and flatten the fitted exponent
+CALIBRATION_MIN_SECONDS = 0.05
+
+
+def method_available(name):
+    return all(importlib.util.find_spec(module) is not None for module in REQUIRES.get(name, []))
+
+
+def estimate_seconds(name, sizes):
+    # sizes: [(nodes, edges)] of every graph the method runs on, None without a model
+    model = cost_model.get(name)
+    if model is None:
+        return None
+    return sum(model["a"] * (nodes + edges) ** model["b"] for nodes, edges in sizes)
+
+
+def makespan(costs, workers):
+    # Sequential runs add up, a pool of workers is bounded by its longest task
+    if not costs:
+        return 0.0
+    return max(max(costs), sum(costs) / workers)
+
+
+def select_methods(methods, method_sizes, budget, workers=None):
+    # methods: requested names in order, method_sizes: name -> [(nodes, edges)] of its tasks
+    # Returns the methods to run and {name: report} of the ones replaced or skipped
+    workers = max(workers or 1, 1)
+    selected, costs, report = [], [], {}
+    for name in methods:
+        estimate = estimate_seconds(name, method_sizes[name])
+        if estimate is None and name not in SUBSTITUTES:
+            selected.append(name)
+            continue
+        if estimate is not None:
+            tasks = [estimate_seconds(name, [size]) for size in method_sizes[name]]
+            if makespan(costs + tasks, workers) <= budget:
+                selected.append(name)
+                costs += tasks
+                continue
+
+        entry = {"estimate_seconds": None if estimate is None else round(estimate, 3), "budget_seconds": budget}
+        reason = "without a cost model" if estimate is None else f"estimated at {estimate:.2f}s"
+        for substitute in SUBSTITUTES.get(name, []):
+            if substitute in methods or substitute in selected or not method_available(substitute):
+                continue
+            substitute_tasks = [estimate_seconds(substitute, [size]) for size in method_sizes[name]]
+            if None in substitute_tasks or makespan(costs + substitute_tasks, workers) > budget:
+                continue
+            selected.append(substitute)
+            costs += substitute_tasks
+            report[name] = {"substituted": {**entry, "by": substitute,
+                                            "substitute_estimate_seconds": round(sum(substitute_tasks), 3)}}
+            print(f"Selection: {name} {reason}, replaced by {substitute}")
+            break
+        else:
+            report[name] = {"skipped": entry}
+            print(f"Selection: {name} {reason}, skipped for the {budget}s budget")
+    return selected, report
+
+
+def load_cost_model(path):
+    # Fitted methods replace the defaults, the others keep them
+    with open(path, 'r') as f:
+        cost_model.update(json.load(f))
+
+
+def report_samples(report):
+    # (method, size, median seconds) of every method run of a bench.py report
+    for result in report["graphs"].values():
+        sizes = result.get("sizes")
+        if sizes is None:
+            continue
+        for stage, summary in result["stages"].items():
+            if not stage.startswith(('bipartite_', 'unipartite_')) or "p50_seconds" not in summary:
+                continue
+            name, _, graph = stage.partition(';')
+            nodes, edges = sizes[graph or "bipartite"]
+            yield name, nodes + edges, summary["p50_seconds"]
+
+
+def fit_cost_model(reports):
+    samples = {}
+    for report in reports:
+        for name, size, seconds in report_samples(report):
+            if seconds > 0:
+                samples.setdefault(name, []).append((size, seconds))
+
+    model = {}
+    for name, points in sorted(samples.items()):
+        slow = [point for point in points if point[1] >= CALIBRATION_MIN_SECONDS]
+        points = slow if len(slow) >= 2 else points
+        if len({size for size, _ in points}) < 2:
+            print(f"Warning: not enough graph sizes to fit {name}. Skipping.")
+            continue
+        # Least squares line through log(seconds) = log(a) + b log(size)
+        b, log_a = np.polyfit(np.log([size for size, _ in points]), np.log([s for _, s in points]), 1)
+        model[name] = {"a": float(f"{math.exp(log_a):.3g}"), "b": round(float(b), 2)}
+    return model
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Fit the method cost model on bench.py reports")
+    parser.add_argument('reports', nargs='+', help="bench.py report files")
+    parser.add_argument('--out', default=None, help="cost model path, printed when not given")
+    return parser.parse_args()
+
+
+def calibrate():
+    args = parse_args()
+    reports = []
+    for path in args.reports:
+        with open(path, 'r') as f:
+            reports.append(json.load(f))
+    model = fit_cost_model(reports)
+    if args.out is None:
+        json.dump(model, sys.stdout, indent=2)
+        print()
+        return
+    with open(args.out, 'w') as f:
+        json.dump(model, f, indent=2)
+    print(f"Cost model saved to: {args.out}")
+
+
+if __name__ == "__main__":
+    calibrate()
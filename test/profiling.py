@@ -0,0 +1,98 @@
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    # Windows, the peak working set comes from psutil when it is installed
+    resource = None
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# Opt-in timing and memory figures (--profile). Every measurement is a dict
+#   {"ns": wall clock time, "traced_peak_bytes": peak Python allocations above
+#    the level at the start (only while tracemalloc runs), "peak_rss_bytes":
+#    high-water mark of the process resident set so far, None where the platform
+#    does not report it}
+# The flags are module globals, so the method and worker processes only inherit
+# them when they are forked. Under spawn (the only start method on Windows) the
+# children import this module again with profiling off: the figures of methods
+# run in a separate process (--method-workers, --method-timeout) and of the runs
+# of --batch and --serve workers are then not recorded.
+enabled = False
+log_path = None
+
+# Measurements in progress, a nested measurement resets the tracemalloc peak
+# so it is folded into the enclosing ones first
+active = []
+
+
+def enable(metrics_log=None, trace_memory=False):
+    global enabled, log_path
+    enabled = True
+    log_path = metrics_log
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def peak_rss(children=False):
+    # ru_maxrss is in kilobytes on Linux; the children figure is the largest terminated child process
+    if resource is not None:
+        return resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss * 1024
+    if psutil is not None and not children:
+        return getattr(psutil.Process().memory_info(), 'peak_wset', None)
+    return None
+
+
+def fold_peak():
+    peak = tracemalloc.get_traced_memory()[1]
+    for frame in active:
+        frame['peak'] = max(frame['peak'], peak)
+
+
+@contextmanager
+def measure():
+    figures = {}
+    frame = None
+    if tracemalloc.is_tracing():
+        fold_peak()
+        tracemalloc.reset_peak()
+        frame = {'peak': 0, 'base': tracemalloc.get_traced_memory()[0]}
+        active.append(frame)
+    start = time.perf_counter_ns()
+    try:
+        yield figures
+    finally:
+        figures["ns"] = time.perf_counter_ns() - start
+        if frame is not None:
+            fold_peak()
+            active.remove(frame)
+            figures["traced_peak_bytes"] = max(0, frame['peak'] - frame['base'])
+        figures["peak_rss_bytes"] = peak_rss()
+
+
+@contextmanager
+def stage(profile, name):
+    # Records the stage under profile["stages"][name], does nothing without a profile
+    if profile is None:
+        yield
+        return
+    with measure() as figures:
+        yield
+    profile.setdefault("stages", {})[name] = figures
+
+
+def new_profile():
+    return {"stages": {}} if enabled else None
+
+
+def log_run(record):
+    if log_path is None:
+        return
+    # One short line per run, appends from several processes do not interleave
+    with open(log_path, 'a') as f:
+        f.write(json.dumps({"time": time.time(), **record}, separators=(',', ':')) + '\n')
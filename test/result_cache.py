@@ -0,0 +1,100 @@
+import hashlib
+import json
+import sqlite3
+import time
+import zlib
+
+# Bump when the layout of the cached entries changes so stale rows are never served
+CACHE_VERSION = 1
+
+
+def graph_hash(group0, group1, edges):
+    # Canonical, order-insensitive hash of the bipartite graph as the solver sends it.
+    # Node ids are kept: cached communities are expressed in them, so only graphs
+    # with the same labelling may share an entry.
+    group0 = sorted(set(int(n) for n in group0))
+    group1 = sorted(set(int(n) for n in group1))
+    side0 = set(group0)
+    canonical_edges = sorted(set((int(u), int(v)) if u in side0 else (int(v), int(u)) for u, v in edges))
+
+    h = hashlib.sha256()
+    h.update(json.dumps([CACHE_VERSION, group0, group1, canonical_edges], separators=(',', ':')).encode())
+    return h.hexdigest()
+
+
+def method_key(graph_key, method, params):
+    h = hashlib.sha256()
+    h.update(f"{graph_key}|{method}|{sorted(params.items())!r}".encode())
+    return h.hexdigest()
+
+
+class ResultCache:
+    def __init__(self, path, max_bytes=256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.db = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS results ("
+                        "key TEXT PRIMARY KEY, value BLOB, size INTEGER, last_access REAL)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS results_last_access ON results(last_access)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, count INTEGER)")
+        self.db.execute("INSERT OR IGNORE INTO stats VALUES ('hits', 0), ('misses', 0)")
+
+    def _count(self, name):
+        self.db.execute("UPDATE stats SET count = count + 1 WHERE name = ?", (name,))
+
+    def get(self, key):
+        row = self.db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self._count('misses')
+            return None
+
+        self.db.execute("UPDATE results SET last_access = ? WHERE key = ?", (time.time(), key))
+        self._count('hits')
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, key, value):
+        blob = zlib.compress(json.dumps(value, separators=(',', ':')).encode())
+        self.db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)", (key, blob, len(blob), time.time()))
+        self.evict()
+
+    def evict(self):
+        # Drop least recently used entries until the store is back under its size cap
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            for key, size in self.db.execute("SELECT key, size FROM results ORDER BY last_access").fetchall():
+                if total <= self.max_bytes:
+                    break
+                self.db.execute("DELETE FROM results WHERE key = ?", (key,))
+                total -= size
+            self.db.execute("COMMIT")
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+
+    def stats(self):
+        counts = dict(self.db.execute("SELECT name, count FROM stats").fetchall())
+        entries, size = self.db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        lookups = counts['hits'] + counts['misses']
+        return {
+            "hits": counts['hits'],
+            "misses": counts['misses'],
+            "hit_rate": counts['hits'] / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes
+        }
+
+
+# One connection per process and cache file
+open_caches = {}
+
+
+def open_cache(path, max_bytes=256 * 1024 * 1024):
+    if path not in open_caches:
+        open_caches[path] = ResultCache(path, max_bytes)
+    return open_caches[path]
@@ -0,0 +1,139 @@
+import json
+import mmap
+import struct
+
+import numpy as np
+
+# Output formats of the *_set0_results / *_set1_results files:
+#   json     indented JSON, the original format read by the solver
+#   compact  the same JSON without whitespace, written method by method
+#   binary   columnar layout below, read with load_results
+#
+# Binary layout (little endian):
+#   magic b'GR1R' | uint32 version | uint32 header length
+#   header: UTF-8 JSON {"methods": [{"name", "metrics", "num_nodes", "num_communities"},
+#           {"name", "timeout"}, {"name", "error"}, {"name", "skipped"}
+#           or {"name", "substituted"}, ...]}
+#           with the "hierarchy" of hierarchical methods (see hierarchy.py) and
+#           the "profile" figures of the run and of every method when profiling,
+#           padded with spaces to a multiple of 8 bytes
+#   then for every method with communities, in header order:
+#       int32 nodes[num_nodes]   the nodes, community by community
+#       int32 labels[num_nodes]  community index of every node
+RESULTS_MAGIC = b'GR1R'
+RESULTS_VERSION = 1
+RESULTS_PREAMBLE = struct.Struct('<4sII')
+
+RESULT_EXTENSIONS = {'json': '.json', 'compact': '.json', 'binary': '.bin'}
+
+
+def metric_value(value):
+    return float(value) if isinstance(value, np.number) else value
+
+
+def write_results_compact(results, filename, default=None, profile=None):
+    # Streams one method at a time instead of building the whole document first
+    with open(filename, 'w') as f:
+        f.write('{')
+        for i, (method, data) in enumerate(results.items()):
+            if 'communities' not in data:
+                entry = data
+            else:
+                entry = {
+                    "communities": [[int(node) for node in comm] for comm in data["communities"]],
+                    "metrics": {k: metric_value(v) for k, v in data["metrics"].items()}
+                }
+                for key in ('hierarchy', 'profile'):
+                    if key in data:
+                        entry[key] = data[key]
+            f.write((',' if i else '') + json.dumps(method) + ':')
+            f.write(json.dumps(entry, separators=(',', ':'), default=default))
+        if profile is not None:
+            f.write((',' if results else '') + '"profile":' + json.dumps(profile, separators=(',', ':')))
+        f.write('}')
+
+
+def write_results_binary(results, filename, profile=None):
+    header = []
+    columns = []
+    for method, data in results.items():
+        if 'communities' not in data:
+            header.append({"name": method, **data})
+            continue
+
+        communities = data["communities"]
+        sizes = [len(comm) for comm in communities]
+        nodes = np.fromiter((node for comm in communities for node in comm), dtype=np.int32, count=sum(sizes))
+        labels = np.repeat(np.arange(len(communities), dtype=np.int32), sizes)
+        header.append({
+            "name": method,
+            "metrics": {k: metric_value(v) for k, v in data["metrics"].items()},
+            "num_nodes": len(nodes),
+            "num_communities": len(communities)
+        })
+        for key in ('hierarchy', 'profile'):
+            if key in data:
+                header[-1][key] = data[key]
+        columns += [nodes, labels]
+
+    header = {"methods": header}
+    if profile is not None:
+        header["profile"] = profile
+    encoded = json.dumps(header, separators=(',', ':')).encode()
+    encoded += b' ' * (-(RESULTS_PREAMBLE.size + len(encoded)) % 8)
+    offset = RESULTS_PREAMBLE.size + len(encoded)
+    size = offset + sum(4 * len(column) for column in columns)
+
+    # Written through a map of the final size, the columns are copied straight into it
+    # and the reader (load_results, the solver) maps the same pages
+    with open(filename, 'w+b') as f:
+        f.truncate(size)
+        with mmap.mmap(f.fileno(), size) as buffer:
+            RESULTS_PREAMBLE.pack_into(buffer, 0, RESULTS_MAGIC, RESULTS_VERSION, len(encoded))
+            buffer[RESULTS_PREAMBLE.size:offset] = encoded
+            for column in columns:
+                np.ndarray(len(column), dtype='<i4', buffer=buffer, offset=offset)[:] = column
+                offset += 4 * len(column)
+
+
+def read_results_binary(buffer):
+    magic, version, header_length = RESULTS_PREAMBLE.unpack_from(buffer, 0)
+    if magic != RESULTS_MAGIC or version != RESULTS_VERSION:
+        raise ValueError("Not a binary results file")
+    offset = RESULTS_PREAMBLE.size
+    header = json.loads(bytes(buffer[offset:offset + header_length]))
+    offset += header_length
+
+    results = {}
+    for entry in header["methods"]:
+        if 'num_nodes' not in entry:
+            results[entry["name"]] = {k: v for k, v in entry.items() if k != 'name'}
+            continue
+
+        count = entry["num_nodes"]
+        nodes = np.frombuffer(buffer, dtype='<i4', count=count, offset=offset)
+        labels = np.frombuffer(buffer, dtype='<i4', count=count, offset=offset + 4 * count)
+        offset += 8 * count
+
+        # Nodes are stored community by community, the label counts give the community boundaries
+        sizes = np.bincount(labels, minlength=entry["num_communities"])
+        results[entry["name"]] = {
+            "communities": [chunk.tolist() for chunk in np.split(nodes, np.cumsum(sizes)[:-1])] if len(sizes) else [],
+            "metrics": entry["metrics"]
+        }
+        for key in ('hierarchy', 'profile'):
+            if key in entry:
+                results[entry["name"]][key] = entry[key]
+    if 'profile' in header:
+        results["profile"] = header["profile"]
+    return results
+
+
+def load_results(filename):
+    # Reads any of the three formats back into the dict the json format contains
+    with open(filename, 'rb') as f:
+        if f.read(len(RESULTS_MAGIC)) != RESULTS_MAGIC:
+            f.seek(0)
+            return json.load(f)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            return read_results_binary(buffer)
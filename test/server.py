@@ -0,0 +1,123 @@
+import asyncio
+import json
+import os
+import traceback
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Wire format: one JSON object per line in each direction.
+#   request:  {"id": 7, "command": "cluster" | "info" | "dummy", "graph": ...}
+#   response: {"id": 7, "status": "ok", "result": {...}}
+#             {"id": 7, "status": "error", "error": "..."}
+# "graph" is either the INPUT.txt text verbatim or
+# {"methods": [...], "group0": [...], "group1": [...], "edges": [[u, v], ...]}.
+# Requests on the same connection are processed concurrently, so responses
+# can arrive out of order and must be matched by "id".
+# Incremental requests carry "graph_id" and either a full "graph" or a "delta"
+# against the graph last sent under that id. The graph is kept by one worker
+# process, so every request with the same "graph_id" is routed to it.
+# A worker process that dies (killed, or crashed in a native backend) fails its
+# requests with an error response and is replaced by a fresh one, without the
+# graphs it kept: the next request of those graph_ids has to send the full graph.
+
+# Large inline graphs do not fit in asyncio's default 64 KiB line limit
+STREAM_LIMIT = 1 << 30
+
+
+def run_request(handler, request):
+    try:
+        return {"status": "ok", "result": handler(request)}
+    except Exception as e:
+        traceback.print_exc()
+        return {"status": "error", "error": str(e)}
+
+
+def pick_worker(request, queued):
+    graph_id = request.get('graph_id') if isinstance(request, dict) else None
+    if graph_id is not None:
+        return zlib.crc32(str(graph_id).encode()) % len(queued)
+    # Everything else goes to the least busy worker
+    return min(range(len(queued)), key=queued.__getitem__)
+
+
+async def process_line(line, handler, executors, queued, writer, write_lock):
+    try:
+        request = json.loads(line)
+        if not isinstance(request, dict):
+            raise ValueError(f"expected a JSON object, got {type(request).__name__}")
+    except ValueError as e:
+        # json.JSONDecodeError is a ValueError
+        response = {"id": None, "status": "error", "error": f"Error: malformed request: {str(e)}"}
+    else:
+        loop = asyncio.get_running_loop()
+        worker = pick_worker(request, queued)
+        executor = executors[worker]
+        queued[worker] += 1
+        try:
+            response = await loop.run_in_executor(executor, run_request, handler, request)
+        except BrokenProcessPool as e:
+            response = {"status": "error", "error": f"Error: worker process died: {str(e)}"}
+            # Every request in flight on the dead worker gets here, the first one replaces it
+            if executors[worker] is executor:
+                executors[worker] = ProcessPoolExecutor(max_workers=1)
+                executor.shutdown(wait=False)
+        finally:
+            queued[worker] -= 1
+        response = {"id": request.get('id'), **response}
+
+    async with write_lock:
+        writer.write(json.dumps(response).encode() + b'\n')
+        await writer.drain()
+
+
+async def handle_connection(reader, writer, handler, executors, queued):
+    write_lock = asyncio.Lock()
+    pending = set()
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if not line.strip():
+                continue
+            task = asyncio.create_task(process_line(line, handler, executors, queued, writer, write_lock))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+
+        # Answer everything that is still in flight before closing
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(handler, host, port, unix_path, workers):
+    # The worker processes import the clustering libraries once and stay warm.
+    # One single process pool per worker, so requests can be pinned to a worker.
+    executors = [ProcessPoolExecutor(max_workers=1) for _ in range(workers or os.cpu_count() or 1)]
+    queued = [0] * len(executors)
+    try:
+        def on_connect(reader, writer):
+            return handle_connection(reader, writer, handler, executors, queued)
+
+        if unix_path:
+            if os.path.exists(unix_path):
+                os.remove(unix_path)
+            srv = await asyncio.start_unix_server(on_connect, path=unix_path, limit=STREAM_LIMIT)
+            print(f"Serving on {unix_path}")
+        else:
+            srv = await asyncio.start_server(on_connect, host, port, limit=STREAM_LIMIT)
+            print(f"Serving on {host}:{port}")
+
+        async with srv:
+            await srv.serve_forever()
+    finally:
+        for executor in executors:
+            executor.shutdown()
+
+
+def run_server(handler, host='127.0.0.1', port=5005, unix_path=None, workers=None):
+    asyncio.run(serve(handler, host, port, unix_path, workers))
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+import main
+import result_format
+
+
+def sample_results():
+    # One entry of every kind save_results writes, with the numpy types the methods return
+    return {
+        "bipartite_CONDOR": {
+            "communities": [[np.int64(0), np.int64(3)], [np.int64(1), np.int64(2), np.int64(4)]],
+            "metrics": {"modularity": np.float64(0.25), "size": 2}
+        },
+        "unipartite_Louvain": {
+            "communities": [[0, 1], [], [2]],
+            "metrics": {"modularity": 0.5},
+            "hierarchy": {"nodes": [0, 1, 2], "base": [0, 1, 2], "merges": [[0, 1]], "levels": [0, 1],
+                          "default": 1},
+            "profile": {"ns": 1200, "peak_rss_bytes": 4096}
+        },
+        "unipartite_Paris": {"communities": [], "metrics": {}},
+        "unipartite_DER": {"timeout": 5.0},
+        "bipartite_BiMLPA": {"error": "Error: no communities"},
+        "unipartite_Girvan-Newman": {"skipped": {"estimate_seconds": 154.2, "budget_seconds": 5.0}},
+        "unipartite_MCODE": {"substituted": {"estimate_seconds": 9.1, "budget_seconds": 5.0,
+                                             "by": "unipartite_Louvain", "substitute_estimate_seconds": 0.4}}
+    }
+
+
+def expected_results(profile):
+    expected = {
+        "bipartite_CONDOR": {"communities": [[0, 3], [1, 2, 4]], "metrics": {"modularity": 0.25, "size": 2}},
+        **{name: entry for name, entry in sample_results().items() if name != "bipartite_CONDOR"}
+    }
+    if profile is not None:
+        expected["profile"] = profile
+    return expected
+
+
+@pytest.mark.parametrize("output_format", sorted(result_format.RESULT_EXTENSIONS))
+@pytest.mark.parametrize("profile", [None, {"stages": {"load": {"ns": 10}}, "sizes": {"bipartite": [5, 6]}}])
+def test_round_trip(tmp_path, output_format, profile):
+    filename = tmp_path / f"results{result_format.RESULT_EXTENSIONS[output_format]}"
+    main.save_results(None, sample_results(), str(filename), output_format, profile=profile)
+    assert result_format.load_results(filename) == expected_results(profile)
+
+
+def test_binary_layout(tmp_path):
+    filename = tmp_path / "results.bin"
+    result_format.write_results_binary(sample_results(), filename)
+    data = filename.read_bytes()
+    assert data[:4] == result_format.RESULTS_MAGIC
+    # The int32 columns start 8-byte aligned and fill the rest of the file
+    _, _, header_length = result_format.RESULTS_PREAMBLE.unpack_from(data, 0)
+    offset = result_format.RESULTS_PREAMBLE.size + header_length
+    assert offset % 8 == 0
+    assert len(data) - offset == 4 * 2 * (5 + 3)
+
+
+def test_load_results_rejects_other_versions(tmp_path):
+    filename = tmp_path / "results.bin"
+    result_format.write_results_binary(sample_results(), filename)
+    data = bytearray(filename.read_bytes())
+    data[4:8] = (result_format.RESULTS_VERSION + 1).to_bytes(4, 'little')
+    filename.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        result_format.load_results(filename)
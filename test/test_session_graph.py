@@ -0,0 +1,30 @@
+import pytest
+
+import main
+
+GRAPH = {"methods": ["unipartite_Louvain"], "group0": [0, 1, 2], "group1": [3, 4],
+         "edges": [[0, 3], [1, 3], [1, 4], [2, 4]]}
+
+
+@pytest.fixture(autouse=True)
+def sessions(monkeypatch):
+    monkeypatch.setattr(main, 'graph_sessions', {})
+
+
+def test_invalid_delta_keeps_the_session():
+    main.session_graph({"graph_id": "g", "graph": GRAPH})
+    with pytest.raises(ValueError):
+        main.session_graph({"graph_id": "g", "delta": {"add_edges": [[1, 99999]]}})
+
+    session = main.session_graph({"graph_id": "g", "delta": {"add_edges": [[0, 4]]}})
+    assert sorted(map(sorted, session['graph'].edges.tolist())) == [[0, 3], [0, 4], [1, 3], [1, 4], [2, 4]]
+    assert sorted(session['projections'][0].edges()) == [(0, 1), (0, 2), (1, 2)]
+
+
+def test_sessions_are_dropped_least_recently_used_first(monkeypatch):
+    monkeypatch.setattr(main, 'MAX_GRAPH_SESSIONS', 2)
+    main.session_graph({"graph_id": "a", "graph": GRAPH})
+    main.session_graph({"graph_id": "b", "graph": GRAPH})
+    main.session_graph({"graph_id": "a", "delta": {"remove_edges": [[2, 4]]}})
+    main.session_graph({"graph_id": "c", "graph": GRAPH})
+    assert list(main.graph_sessions) == ["a", "c"]